@@ -0,0 +1,100 @@
+"""Grid Algorithm Benchmark.
+
+Times the built-in grid algorithms of ``Matrix`` on large random tile maps, next to a
+reference A* written on top of ``Matrix.get`` the way callers did before.
+
+Example:
+    $ python Python/Benchmarks/grid.py 512
+"""
+
+import heapq
+import os
+import random
+import sys
+import time
+
+# Appended rather than prepended: Classes/signal.py would shadow the stdlib module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Classes'))
+
+from matrix import Matrix  # noqa: E402
+
+SIZES = (128, 256)
+WALL_DENSITY = 0.25
+FLOOR, WALL = 0, 1
+
+
+def _tile_map(size: int, seed: int = 0) -> Matrix:
+    """Build a size x size map of random walls with open corners."""
+    rng = random.Random(seed)
+    tiles = Matrix(size, size, empty_index=FLOOR)
+    tiles.storage.assign(WALL if rng.random() < WALL_DENSITY else FLOOR for _ in range(size * size))
+    tiles.insert(FLOOR, 0, 0)
+    tiles.insert(FLOOR, size - 1, size - 1)
+    return tiles
+
+
+def _reference_astar(tiles: Matrix, start: tuple, goal: tuple):
+    """A* reading every cell through ``Matrix.get``, as done outside the class."""
+    heap = [(0, 0, start)]
+    best = {start: 0}
+    came_from = {}
+    while heap:
+        _, spent, cell = heapq.heappop(heap)
+        if cell == goal:
+            path = [cell]
+            while cell != start:
+                cell = came_from[cell]
+                path.append(cell)
+            return path[::-1]
+        if spent > best[cell]:
+            continue
+        row, col = cell
+        for dr, dc in ((-1, 0), (0, -1), (0, 1), (1, 0)):
+            nr, nc = row + dr, col + dc
+            if 0 <= nr < tiles.rows and 0 <= nc < tiles.columns and tiles.get(nr, nc) == FLOOR:
+                total = spent + 1
+                if total < best.get((nr, nc), total + 1):
+                    best[(nr, nc)] = total
+                    came_from[(nr, nc)] = cell
+                    heapq.heappush(heap, (total + abs(goal[0] - nr) + abs(goal[1] - nc), total, (nr, nc)))
+    return None
+
+
+def _timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def run(sizes=SIZES) -> dict:
+    """Time every grid algorithm on maps of the given sizes.
+
+    Args:
+        sizes (tuple): Side lengths of the square maps.
+
+    Returns:
+        dict: ``{'<algorithm> <size>x<size>': seconds}``.
+    """
+    results = {}
+    for size in sizes:
+        tiles = _tile_map(size)
+        start, goal = (0, 0), (size - 1, size - 1)
+        floor = (FLOOR,)
+        results[f'find_path A* {size}x{size}'] = _timed(tiles.find_path, start, goal, passable=floor)
+        results[f'find_path Dijkstra {size}x{size}'] = _timed(
+            tiles.find_path, start, goal, passable=floor, heuristic=False)
+        results[f'reference A* on get() {size}x{size}'] = _timed(_reference_astar, tiles, start, goal)
+        results[f'distance_field {size}x{size}'] = _timed(tiles.distance_field, [start], passable=floor)
+        results[f'connected_components {size}x{size}'] = _timed(tiles.connected_components, passable=floor)
+        results[f'flood_fill {size}x{size}'] = _timed(tiles.copy().flood_fill, start, 2)
+    return results
+
+
+def main():
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or SIZES
+    for name, seconds in run(sizes).items():
+        print(f"{name:<38}{seconds * 1e3:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Small Matrix Microbenchmark.
+
+Times determinant, inverse, multiply, trace and transpose on single 2x2, 3x3 and 4x4
+matrices with the closed-form fast paths, then again with them disabled so the
+general LU / tiled paths run, and prints the speedup. Traces of dense matrices are a
+strided slice at every size, so they show no speedup; traces and transposes of the
+other backends keep their general path.
+
+Example:
+    $ python Python/Benchmarks/small_matrix.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Appended rather than prepended: Classes/signal.py would shadow the stdlib module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Classes'))
+
+import matrix  # noqa: E402
+from matrix import Matrix  # noqa: E402
+
+SIZES = (2, 3, 4)
+NUMBER = 20000
+
+
+def _random_matrix(n: int, storage: str) -> Matrix:
+    """Build an invertible n x n matrix with random float cells."""
+    m = Matrix(n, n, storage=storage)
+    for row in range(n):
+        for col in range(n):
+            m.insert(random.uniform(-1.0, 1.0) + (n if row == col else 0), row, col)
+    return m
+
+
+def _cases(a: Matrix, b: Matrix) -> dict:
+    """Operations to time, as zero-argument callables."""
+    def determinant():
+        a.invalidate()  # Time the factorization, not its cache.
+        return a.determinant()
+
+    def inverse():
+        a.invalidate()
+        return a.inverse()
+
+    return {
+        'determinant': determinant,
+        'inverse': inverse,
+        'multiply': lambda: a.multiply(b),
+        'trace': a.trace,
+        'transpose': a.transpose,
+    }
+
+
+def run(number: int = NUMBER, storage: str = 'dense') -> dict:
+    """Time every operation with and without the small-size fast paths.
+
+    Args:
+        number (int): Calls per measurement.
+        storage (str): Storage backend of the benchmarked matrices.
+
+    Returns:
+        dict: ``{'<op> <n>x<n>': (fast seconds, general seconds)}`` per call.
+    """
+    results = {}
+    for n in SIZES:
+        a, b = _random_matrix(n, storage), _random_matrix(n, storage)
+        for name, case in _cases(a, b).items():
+            fast = timeit.timeit(case, number=number) / number
+            saved, matrix.SMALL_SIZES = matrix.SMALL_SIZES, ()
+            try:
+                general = timeit.timeit(case, number=number) / number
+            finally:
+                matrix.SMALL_SIZES = saved
+            results[f'{name} {n}x{n}'] = (fast, general)
+    return results
+
+
+def main():
+    storage = sys.argv[1] if len(sys.argv) > 1 else 'dense'
+    print(f"{'operation':<18}{'fast (us)':>12}{'general (us)':>14}{'speedup':>10}")
+    for name, (fast, general) in run(storage=storage).items():
+        print(f"{name:<18}{fast * 1e6:>12.2f}{general * 1e6:>14.2f}{general / fast:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""Matrix Benchmark Suite.
+
+Times construction, cell access, fills, multiply, determinant, inverse, transpose and
+find on every storage backend at sizes from 4x4 to 2000x2000, and writes the results as
+JSON. Given the JSON of an earlier run as a baseline, every case is compared against it
+and the run exits with status 1 when any case got slower by more than the threshold.
+
+Cubic operations stop at ``CUBIC_MAX_SIZE`` and the dict backend at ``DICT_MAX_SIZE``, so
+a full run stays within minutes. Grids hold ``DENSITY`` non-empty cells, like tile maps.
+
+Example:
+    $ python Python/Benchmarks/suite.py --output baseline.json
+    $ python Python/Benchmarks/suite.py --sizes 64 256 --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+
+# Appended rather than prepended: Classes/signal.py would shadow the stdlib module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Classes'))
+
+import matrix  # noqa: E402
+from matrix import Matrix  # noqa: E402
+
+SIZES = (4, 16, 64, 256, 1000, 2000)
+# Name: (storage, typecode).
+BACKENDS = {
+    'dense': ('dense', None),
+    'dense-d': ('dense', 'd'),
+    'sparse': ('sparse', None),
+    'chunked': ('chunked', None),
+    'dict': ('dict', None),
+}
+CUBIC_MAX_SIZE = 256
+DICT_MAX_SIZE = 1000
+DENSITY = 0.1
+ACCESSES = 1000
+REPEAT = 3
+# Calls per timed run are chosen so that a run takes at least this many seconds.
+MIN_TIME = 0.05
+THRESHOLD = 0.1
+
+
+def _random_matrix(size: int, backend: str, seed: int = 0) -> Matrix:
+    """Build a size x size matrix of small whole floats with a dominant diagonal."""
+    storage, typecode = BACKENDS[backend]
+    rng = random.Random(seed)
+    m = Matrix(size, size, storage=storage, typecode=typecode, empty_index=0)
+    m.storage.assign(float(rng.randrange(1, 10)) if rng.random() < DENSITY else 0.0 for _ in range(size * size))
+    for i in range(size):
+        m.storage.set(i, i, 10.0 * size)
+    m.invalidate()
+    return m
+
+
+def _cases(size: int, backend: str) -> dict:
+    """Operations to time on one backend and size, as zero-argument callables.
+
+    Every case works on its own copy of the operands, so cases that write (insert,
+    fills, transpose) never change the matrix a later case measures.
+    """
+    storage, typecode = BACKENDS[backend]
+    a, b = _random_matrix(size, backend), _random_matrix(size, backend, seed=1)
+    rng = random.Random(2)
+    cells = [(rng.randrange(size), rng.randrange(size)) for _ in range(ACCESSES)]
+    quarter, radius = size // 4, size // 3
+
+    def get(m=a.copy()):
+        for row, col in cells:
+            m.get(row, col)
+
+    def insert(m=a.copy()):
+        for row, col in cells:
+            m.insert(1.0, row, col)
+
+    def determinant(m=a.copy()):
+        m.invalidate()  # Time the factorization, not its cache.
+        return m.determinant()
+
+    def inverse(m=a.copy()):
+        m.invalidate()
+        return m.inverse()
+
+    cases = {
+        'construct': lambda: Matrix(size, size, storage=storage, typecode=typecode, empty_index=0),
+        f'get x{ACCESSES}': get,
+        f'insert x{ACCESSES}': insert,
+        'fill_rect': lambda m=a.copy(): m.fill_rect(2.0, (quarter, quarter), (size // 2, size // 2)),
+        'fill_circ': lambda m=a.copy(): m.fill_circ((size // 2, size // 2), radius, 3.0),
+        'transpose': a.copy().transpose,
+        'find': lambda m=a.copy(): m.find(5.0),
+    }
+    if size <= CUBIC_MAX_SIZE:
+        cases['multiply'] = lambda m=a.copy(): m.multiply(b)
+        cases['determinant'] = determinant
+        cases['inverse'] = inverse
+    return cases
+
+
+def _time(case, repeat: int) -> float:
+    """Best seconds per call of a case over ``repeat`` timed runs."""
+    timer = timeit.Timer(case)
+    number = max(1, int(MIN_TIME / max(timer.timeit(1), 1e-7)))
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(sizes=SIZES, backends=tuple(BACKENDS), cases=None, repeat: int = REPEAT, progress=None) -> dict:
+    """Time every case on every backend and size.
+
+    Args:
+        sizes (tuple): Side lengths of the square matrices.
+        backends (tuple): Names from ``BACKENDS``.
+        cases (tuple): Case names to keep (e.g. ``('multiply', 'find')``), None for all.
+        repeat (int): Timed runs per case; the best one is kept.
+        progress (callable): Optional ``progress(name, seconds)`` called after each case.
+
+    Returns:
+        dict: ``{'<case> <backend> <size>x<size>': seconds}`` per call.
+    """
+    results = {}
+    for backend in backends:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        for size in sizes:
+            if backend == 'dict' and size > DICT_MAX_SIZE:
+                continue
+            for case_name, case in _cases(size, backend).items():
+                if cases is not None and case_name.split()[0] not in cases:
+                    continue
+                name = f'{case_name} {backend} {size}x{size}'
+                results[name] = _time(case, repeat)
+                if progress is not None:
+                    progress(name, results[name])
+    return results
+
+
+def environment() -> dict:
+    """Describe the interpreter and optional dependencies the results were taken with."""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'numpy': getattr(matrix.numpy, '__version__', None),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    """Compare results against a baseline run.
+
+    Cases missing from either side are ignored.
+
+    Args:
+        results (dict): ``{name: seconds}`` of this run.
+        baseline (dict): ``{name: seconds}`` of the baseline run.
+        threshold (float): Allowed slowdown as a fraction, 0.1 for 10%.
+
+    Returns:
+        list: ``(name, baseline seconds, seconds, ratio, regressed)`` per shared case.
+    """
+    rows = []
+    for name, seconds in results.items():
+        if name in baseline:
+            ratio = seconds / baseline[name] if baseline[name] else float('inf')
+            rows.append((name, baseline[name], seconds, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def _arguments(argv):
+    parser = argparse.ArgumentParser(description='Benchmark Matrix across storage backends and sizes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='matrix side lengths')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--cases', nargs='+', help='only run these cases, e.g. multiply find')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='timed runs per case, best is kept')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown fraction counted as a regression (default %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _arguments(argv)
+    results = run(args.sizes, args.backends, args.cases, args.repeat,
+                  progress=lambda name, seconds: print(f"{name:<40}{seconds * 1e3:>12.3f} ms"))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'environment': environment(), 'results': results}, file, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'case':<40}{'baseline (ms)':>14}{'now (ms)':>12}{'ratio':>8}")
+    for name, before, now, ratio, regressed in rows:
+        print(f"{name:<40}{before * 1e3:>14.3f}{now * 1e3:>12.3f}{ratio:>7.2f}x{'  REGRESSION' if regressed else ''}")
+    regressions = sum(regressed for *_, regressed in rows)
+    print(f"\n{regressions} of {len(rows)} cases slower than the baseline by more than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
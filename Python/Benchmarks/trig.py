@@ -0,0 +1,78 @@
+"""Trigonometry Benchmark.
+
+Times sin, cos and tan from ``Functions/math.py`` in every accuracy tier (the
+range-reduced polynomials and the interpolated tables at each size in
+``TRIG_TABLE_SIZES``) next to the stdlib ``math`` functions, and reports the largest
+absolute error of each against the stdlib on the same random angles.
+
+Example:
+    $ python Python/Benchmarks/trig.py 1e6
+"""
+
+import importlib.util
+import math
+import os
+import random
+import sys
+import time
+from functools import partial
+
+# Functions/math.py shares its name with the stdlib module, so it is loaded by path.
+_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Functions', 'math.py')
+_SPEC = importlib.util.spec_from_file_location('functions_math', _PATH)
+fmath = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(fmath)
+
+COUNT = 100000
+SPAN = 10.0
+
+
+def _tiers() -> dict:
+    """Implementations to compare, as ``{tier: (sin, cos, tan)}``."""
+    tiers = {
+        'stdlib math': (math.sin, math.cos, math.tan),
+        'range-reduced polynomial': (fmath.sin, fmath.cos, fmath.tan),
+    }
+    for size in fmath.TRIG_TABLE_SIZES:
+        tiers[f'table {size}'] = tuple(partial(function, size=size)
+                                       for function in (fmath.sin_table, fmath.cos_table, fmath.tan_table))
+    return tiers
+
+
+def run(span: float = SPAN, count: int = COUNT, seed: int = 0) -> dict:
+    """Time every tier on random angles and measure its error.
+
+    Args:
+        span (float): Angles are drawn uniformly from [-span, span].
+        count (int): Number of angles.
+        seed (int): Random seed.
+
+    Returns:
+        dict: ``{'<function> <tier>': (seconds per call, max abs error)}``. The tan error
+            is relative for values above 1 in magnitude.
+    """
+    rng = random.Random(seed)
+    angles = [rng.uniform(-span, span) for _ in range(count)]
+    references = [[function(a) for a in angles] for function in (math.sin, math.cos, math.tan)]
+    results = {}
+    for tier, functions in _tiers().items():
+        for name, function, reference in zip(('sin', 'cos', 'tan'), functions, references):
+            function(angles[0])  # Build any table outside of the timed loop.
+            start = time.perf_counter()
+            values = [function(a) for a in angles]
+            seconds = (time.perf_counter() - start) / count
+            error = max(abs(value - exact) / max(1.0, abs(exact)) for value, exact in zip(values, reference))
+            results[f'{name} {tier}'] = (seconds, error)
+    return results
+
+
+def main():
+    span = float(sys.argv[1]) if len(sys.argv) > 1 else SPAN
+    print(f"angles in [-{span:g}, {span:g}]")
+    print(f"{'function':<32}{'ns/call':>10}{'max error':>14}")
+    for name, (seconds, error) in run(span).items():
+        print(f"{name:<32}{seconds * 1e9:>10.0f}{error:>14.2e}")
+
+
+if __name__ == '__main__':
+    main()
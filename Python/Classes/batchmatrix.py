@@ -0,0 +1,314 @@
+from array import array
+from operator import mul
+
+from matrix import ADJUGATE_KERNELS, DETERMINANT_KERNELS, DOT_KERNELS, SMALL_SIZES, Matrix
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Sizes with closed-form kernels.
+BATCH_SIZES = SMALL_SIZES
+
+
+class BatchMatrix:
+    """
+    A batch of same-size 2x2, 3x3 or 4x4 matrices stored as a struct of arrays.
+
+    Cell (row, column) of every matrix in the batch lives in one contiguous ``array``
+    (``component(row, column)[index]``), so batched operations run as a handful of
+    closed-form, fully unrolled formulas over whole components instead of one
+    ``Matrix`` operation per matrix. With NumPy available the formulas run on zero-copy
+    NumPy views of the components; otherwise they are mapped over the arrays.
+
+    Operations between two batches pair matrices by index; a batch of one matrix is
+    broadcast against the other batch.
+    """
+
+    def __init__(self, count: int, size: int, typecode: str = 'd'):
+        """
+        Initialize a batch of zero matrices.
+
+        Args:
+            count (int): Number of matrices in the batch.
+            size (int): Number of rows and columns of each matrix, 2, 3 or 4.
+            typecode (str): ``array`` typecode of the cells.
+
+        Raises:
+            ValueError: If the size is not supported or the count is negative.
+        """
+        if size not in BATCH_SIZES:
+            raise ValueError(f"Batch matrices must be 2x2, 3x3 or 4x4, got {size}x{size}")
+        if count < 0:
+            raise ValueError("Batch count cannot be negative")
+        self.count = count
+        self.size = size
+        self.typecode = typecode
+        self.components = [array(typecode, bytes(array(typecode).itemsize * count)) for _ in range(size * size)]
+
+    @classmethod
+    def identity(cls, count: int, size: int, typecode: str = 'd'):
+        """
+        Create a batch of identity matrices.
+
+        Args:
+            count (int): Number of matrices in the batch.
+            size (int): Number of rows and columns of each matrix, 2, 3 or 4.
+            typecode (str): ``array`` typecode of the cells.
+
+        Returns:
+            BatchMatrix: The batch.
+        """
+        batch = cls(count, size, typecode)
+        for i in range(size):
+            batch.components[i * size + i] = array(typecode, [1]) * count
+        return batch
+
+    @classmethod
+    def from_matrices(cls, matrices, typecode: str = 'd'):
+        """
+        Pack matrices into a batch.
+
+        Args:
+            matrices (list): Square ``Matrix`` objects of the same size.
+            typecode (str): ``array`` typecode of the cells.
+
+        Returns:
+            BatchMatrix: The batch.
+
+        Raises:
+            ValueError: If the list is empty or the matrices are not all of one supported size.
+        """
+        matrices = list(matrices)
+        if not matrices:
+            raise ValueError("Cannot build a batch from no matrices")
+        size = matrices[0].rows
+        if any(matrix.rows != size or matrix.columns != size for matrix in matrices):
+            raise ValueError("All matrices of a batch must be square and of the same size")
+        batch = cls(0, size, typecode)
+        cells = [list(matrix.storage.values()) for matrix in matrices]
+        batch.components = [array(typecode, column) for column in zip(*cells)]
+        batch.count = len(matrices)
+        return batch
+
+    def to_matrices(self) -> list:
+        """
+        Unpack the batch into separate matrices.
+
+        Returns:
+            list: One dense ``Matrix`` per batch entry, with this batch's typecode.
+        """
+        return [self[index] for index in range(self.count)]
+
+    def component(self, row: int, column: int) -> array:
+        """
+        Get the array holding cell (row, column) of every matrix in the batch.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+
+        Returns:
+            array: The component, shared with the batch.
+        """
+        return self.components[row * self.size + column]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Matrix:
+        """
+        Copy one matrix of the batch out.
+
+        Args:
+            index (int): The batch index.
+
+        Returns:
+            Matrix: A dense matrix with this batch's typecode.
+        """
+        matrix = Matrix(self.size, self.size, typecode=self.typecode)
+        matrix.storage.assign([component[index] for component in self.components])
+        return matrix
+
+    def __setitem__(self, index: int, matrix: Matrix) -> None:
+        """
+        Overwrite one matrix of the batch.
+
+        Args:
+            index (int): The batch index.
+            matrix (Matrix): A matrix of the batch's size.
+
+        Raises:
+            ValueError: If the matrix has the wrong size.
+        """
+        if matrix.rows != self.size or matrix.columns != self.size:
+            raise ValueError(f"Expected a {self.size}x{self.size} matrix")
+        for component, value in zip(self.components, matrix.storage.values()):
+            component[index] = value
+
+    def _vectors(self, count: int = None) -> list:
+        """
+        Get the components as operands of the kernels: NumPy views when NumPy is available,
+        otherwise the arrays, with a single-matrix batch repeated ``count`` times.
+        """
+        if numpy is not None:
+            return [numpy.frombuffer(component, dtype=self.typecode) for component in self.components]
+        if count is not None and self.count == 1 and count != 1:
+            return [component * count for component in self.components]
+        return self.components
+
+    @staticmethod
+    def _run(kernel, vectors) -> list:
+        """
+        Evaluate a scalar cell kernel over whole components.
+
+        Returns:
+            list: One sequence per kernel output.
+        """
+        if numpy is not None:
+            return list(kernel(*vectors))
+        return list(zip(*map(kernel, *vectors)))
+
+    def _broadcast_count(self, other) -> int:
+        """
+        Get the batch count of an operation with another batch, or raise a ValueError.
+        """
+        if other.size != self.size:
+            raise ValueError(f"Cannot combine {self.size}x{self.size} and {other.size}x{other.size} batches")
+        if self.count != other.count and 1 not in (self.count, other.count):
+            raise ValueError(f"Cannot combine batches of {self.count} and {other.count} matrices")
+        return max(self.count, other.count)
+
+    def _store(self, out, count: int, values: list):
+        """
+        Write computed components into ``out`` (a new batch if None) and return it.
+        """
+        if out is None:
+            out = BatchMatrix(count, self.size, self.typecode)
+        elif out.size != self.size or out.count != count:
+            raise ValueError(f"Output batch must hold {count} {self.size}x{self.size} matrices")
+        typecode = out.typecode
+        if numpy is not None:
+            for component, value in zip(out.components, values):
+                numpy.frombuffer(component, dtype=typecode)[:] = value
+        else:
+            for component, value in zip(out.components, values):
+                component[:] = array(typecode, value)
+        return out
+
+    def multiply(self, other, out=None):
+        """
+        Multiply every matrix of this batch by the matrix of the same index in another batch.
+
+        Args:
+            other (BatchMatrix): The right operands.
+            out (BatchMatrix): Optional batch receiving the products. It may be an operand.
+
+        Returns:
+            BatchMatrix: The batch of products.
+
+        Raises:
+            ValueError: If the batches have different sizes or incompatible counts.
+        """
+        count = self._broadcast_count(other)
+        size, dot = self.size, DOT_KERNELS[self.size]
+        left, right = self._vectors(count), other._vectors(count)
+        products = []
+        for row in range(size):
+            left_row = left[row * size:(row + 1) * size]
+            for col in range(size):
+                operands = left_row + right[col::size]
+                products.append(dot(*operands) if numpy is not None else list(map(dot, *operands)))
+        return self._store(out, count, products)
+
+    def __matmul__(self, other):
+        if not isinstance(other, BatchMatrix):
+            return NotImplemented
+        return self.multiply(other)
+
+    def determinant(self):
+        """
+        Compute the determinant of every matrix in the batch.
+
+        Returns:
+            array: The determinants, in batch order, with this batch's typecode
+                (``'d'`` for integer typecodes).
+        """
+        kernel = DETERMINANT_KERNELS[self.size]
+        typecode = self.typecode if self.typecode in 'fd' else 'd'
+        if numpy is not None:
+            return array(typecode, numpy.asarray(kernel(*self._vectors()), dtype=typecode).tobytes())
+        return array(typecode, map(kernel, *self.components))
+
+    def inverse(self, out=None):
+        """
+        Invert every matrix in the batch from its closed-form adjugate.
+
+        Args:
+            out (BatchMatrix): Optional batch receiving the inverses. It may be this batch.
+
+        Returns:
+            BatchMatrix: The batch of inverses, with typecode ``'d'`` unless ``out`` is given.
+
+        Raises:
+            ValueError: If any matrix of the batch is singular.
+        """
+        *adjugate, determinant = self._run(ADJUGATE_KERNELS[self.size], self._vectors())
+        if numpy is not None:
+            singular = numpy.flatnonzero(numpy.asarray(determinant) == 0)
+            if singular.size:
+                raise ValueError(f"Matrix {singular[0]} of the batch is singular and cannot be inverted")
+            scale = 1.0 / numpy.asarray(determinant, dtype='d')
+            inverse = [cell * scale for cell in adjugate]
+        else:
+            if 0 in determinant:
+                raise ValueError(f"Matrix {determinant.index(0)} of the batch is singular and cannot be inverted")
+            scale = [1.0 / value for value in determinant]
+            inverse = [list(map(mul, scale, cell)) for cell in adjugate]
+        if out is None:
+            out = BatchMatrix(self.count, self.size)
+        return self._store(out, self.count, inverse)
+
+    def transform_points(self, *coordinates) -> list:
+        """
+        Transform one point per matrix, given as coordinate arrays.
+
+        With ``size - 1`` coordinates the points are treated as affine: each is extended
+        with w = 1, the last column of a matrix acts as a translation and its last row is
+        ignored. With ``size`` coordinates the points are multiplied as plain vectors.
+        A batch of one matrix transforms any number of points; coordinate sequences of
+        length 1 are broadcast against larger batches.
+
+        Args:
+            *coordinates (sequence): The x, y, ... coordinates of the points, one sequence
+                per axis (lists, arrays or NumPy arrays).
+
+        Returns:
+            list: One ``array('d')`` per output axis.
+
+        Raises:
+            ValueError: If the number of axes or the number of points does not fit the batch.
+        """
+        size = self.size
+        if len(coordinates) not in (size - 1, size):
+            raise ValueError(f"Expected {size - 1} or {size} coordinate sequences for {size}x{size} matrices")
+        lengths = {len(axis) for axis in coordinates}
+        if len(lengths) != 1:
+            raise ValueError("All coordinate sequences must have the same length")
+        points = lengths.pop()
+        count = max(self.count, points)
+        if 1 not in (self.count, points) and self.count != points:
+            raise ValueError(f"Cannot transform {points} points with a batch of {self.count} matrices")
+        matrix = self._vectors(count)
+        dot = DOT_KERNELS[size]
+        if numpy is not None:
+            axes = [numpy.asarray(axis, dtype='d') for axis in coordinates]
+            if len(axes) < size:
+                axes.append(1.0)
+            return [array('d', numpy.broadcast_to(dot(*matrix[row * size:(row + 1) * size], *axes), count).tobytes())
+                    for row in range(len(coordinates))]
+        axes = [axis if points == count else array('d', axis) * count for axis in coordinates]
+        if len(axes) < size:
+            axes.append(array('d', [1.0]) * count)
+        return [array('d', map(dot, *matrix[row * size:(row + 1) * size], *axes)) for row in range(len(coordinates))]
@@ -1,449 +1,4051 @@
-from math import nan, isnan
+import heapq
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from fractions import Fraction
+from functools import reduce
+from itertools import chain, islice, repeat
+from math import inf, isnan, lcm, nan, sqrt
+from numbers import Rational
+from operator import add, itemgetter, mul, sub
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Products with at least this many multiply-adds go to numpy.matmul when NumPy is available.
+NUMPY_THRESHOLD = 32 ** 3
+# Number of right-hand columns kept hot per tile by the pure Python multiply kernel.
+BLOCK_SIZE = 64
+# Products with at least this many multiply-adds are split across worker processes
+# when NumPy is not available and more than one worker is configured.
+PARALLEL_THRESHOLD = 96 ** 3
+PARALLEL_WORKERS = os.cpu_count() or 1
+MULTIPLY_BACKENDS = ('auto', 'python', 'numpy', 'parallel')
+# array typecodes a buffer can be wrapped with; each is also a NumPy dtype character.
+BUFFER_TYPECODES = 'bBhHiIlLqQfd'
+# Matrix file header: magic, format version, typecode, byte order ('l'/'b'), rows, columns.
+FILE_MAGIC = b'MTRX'
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sBccxQQ')
+# Cells start at this offset so that every typecode is aligned in the mapping.
+FILE_HEADER_SIZE = 32
+
+# (row, column) steps to the neighbors of a cell for each grid connectivity.
+GRID_NEIGHBORS = {
+    4: ((-1, 0), (0, -1), (0, 1), (1, 0)),
+    8: ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)),
+}
+# How stencils read cells beyond the border: a fill value, the nearest border cell, the
+# mirror image (without repeating the border cell) or the opposite side.
+EDGE_MODES = ('constant', 'nearest', 'reflect', 'wrap')
+NUMPY_EDGE_MODES = {'constant': 'constant', 'nearest': 'edge', 'reflect': 'reflect', 'wrap': 'wrap'}
+# Target number of cells per chunk of chunked storage; chunks hold whole rows.
+CHUNK_CELLS = 4096
+# Square matrices of these sizes use the closed-form kernels below instead of the
+# general LU / tiled paths.
+SMALL_SIZES = (2, 3, 4)
+
+
+class DenseStorage:
+    """
+    Contiguous row-major cell storage.
 
-class Matrix:
+    Cells live in one flat buffer and are addressed with stride math
+    (``row * columns + column``). The buffer is a plain list by default, so any
+    Python object can be stored, or an ``array`` when a typecode is given.
     """
-    A class to represent a matrix and perform various matrix operations.
+
+    kind = 'dense'
+
+    def __init__(self, rows: int, columns: int, fill=None, typecode: str = None, data=None):
+        """
+        Initialize the storage with every cell set to the fill value.
+
+        Args:
+            rows (int): Number of rows.
+            columns (int): Number of columns.
+            fill: Initial value of every cell.
+            typecode (str): Optional ``array`` typecode (e.g. 'd') for a packed numeric buffer.
+            data: Optional existing flat buffer to adopt instead of allocating one.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.typecode = typecode
+        if data is not None:
+            self.data = data
+        elif typecode is None:
+            self.data = [fill] * (rows * columns)
+        else:
+            self.data = array(typecode, [fill]) * (rows * columns)
+
+    def _pack(self, values):
+        """
+        Convert an iterable into something that can be slice-assigned into the buffer.
+
+        Args:
+            values: Iterable of cell values.
+
+        Returns:
+            list or array: The packed values.
+        """
+        if self.typecode is None:
+            return values if isinstance(values, list) else list(values)
+        return array(self.typecode, values)
+
+    def get(self, row: int, column: int):
+        return self.data[row * self.columns + column]
+
+    def set(self, row: int, column: int, value) -> None:
+        self.data[row * self.columns + column] = value
+
+    def row(self, row: int) -> list:
+        start = row * self.columns
+        return list(self.data[start:start + self.columns])
+
+    def column(self, column: int) -> list:
+        return list(self.data[column::self.columns])
+
+    def set_row(self, row: int, values) -> None:
+        start = row * self.columns
+        self.data[start:start + self.columns] = self._pack(values)
+
+    def fill_span(self, row: int, start: int, stop: int, value) -> None:
+        """
+        Set the cells ``start..stop-1`` of a row to the same value with one slice assignment.
+        """
+        if stop <= start:
+            return
+        offset = row * self.columns
+        self.data[offset + start:offset + stop] = self._pack([value] * (stop - start))
+
+    def values(self):
+        return iter(self.data)
+
+    def assign(self, values) -> None:
+        """
+        Replace every cell, in row-major order, from an iterable.
+        """
+        self.data[:] = self._pack(values)
+
+    def to_rows(self) -> list:
+        data, columns = self.data, self.columns
+        if not columns:
+            return [[] for _ in range(self.rows)]
+        return [list(data[start:start + columns]) for start in range(0, self.rows * columns, columns)]
+
+    def swap_rows(self, row1: int, row2: int) -> None:
+        data, columns = self.data, self.columns
+        a, b = row1 * columns, row2 * columns
+        first = self._pack(data[a:a + columns])
+        data[a:a + columns] = data[b:b + columns]
+        data[b:b + columns] = first
+
+    def transpose(self) -> None:
+        """
+        Transpose the cells in place, keeping the same buffer.
+        """
+        data, columns = self.data, self.columns
+        values = self._pack([value for col in range(columns) for value in data[col::columns]])
+        self.rows, self.columns = self.columns, self.rows
+        data[:] = values
+
+    def copy(self):
+        data = self.data[:] if self.typecode is None else array(self.typecode, self.data)
+        return DenseStorage(self.rows, self.columns, typecode=self.typecode, data=data)
+
+
+class DictStorage:
+    """
+    Compatibility storage keeping every cell in a dict keyed by ``'r{row}c{column}'``.
+
+    This is the original ``Matrix`` layout. It is kept for code that reads or writes
+    ``Matrix.data`` by key; new code should use the dense storage.
     """
 
-    def __init__(self, rows: int = 10, columns: int = 10):
+    kind = 'dict'
+
+    def __init__(self, rows: int, columns: int, fill=None, typecode: str = None, data=None):
         """
-        Initialize the matrix with the given number of rows and columns.
+        Initialize the storage with every cell set to the fill value.
 
         Args:
-            rows (int): Number of rows in the matrix.
-            columns (int): Number of columns in the matrix.
+            rows (int): Number of rows.
+            columns (int): Number of columns.
+            fill: Initial value of every cell.
+            typecode (str): Ignored, accepted for signature compatibility.
+            data (dict): Optional existing key/value mapping to adopt.
         """
         self.rows = rows
         self.columns = columns
-        self.empty_index = None
-        self.data = {f'r{row}c{col}': self.empty_index for row in range(1, self.rows + 1) for col in range(1, self.columns + 1)}
+        self.typecode = None
+        if data is not None:
+            self.data = data
+        else:
+            self.data = {f'r{row}c{col}': fill for row in range(rows) for col in range(columns)}
 
-    def find_index(self, row: int = nan, column: int = nan):
+    def get(self, row: int, column: int):
+        return self.data[f'r{row}c{column}']
+
+    def set(self, row: int, column: int, value) -> None:
+        self.data[f'r{row}c{column}'] = value
+
+    def row(self, row: int) -> list:
+        return [self.data[f'r{row}c{col}'] for col in range(self.columns)]
+
+    def column(self, column: int) -> list:
+        return [self.data[f'r{row}c{column}'] for row in range(self.rows)]
+
+    def set_row(self, row: int, values) -> None:
+        for col, value in enumerate(values):
+            self.data[f'r{row}c{col}'] = value
+
+    def fill_span(self, row: int, start: int, stop: int, value) -> None:
+        for col in range(start, stop):
+            self.data[f'r{row}c{col}'] = value
+
+    def values(self):
+        return (self.data[f'r{row}c{col}'] for row in range(self.rows) for col in range(self.columns))
+
+    def assign(self, values) -> None:
+        values = iter(values)
+        for row in range(self.rows):
+            for col in range(self.columns):
+                self.data[f'r{row}c{col}'] = next(values)
+
+    def to_rows(self) -> list:
+        return [self.row(row) for row in range(self.rows)]
+
+    def swap_rows(self, row1: int, row2: int) -> None:
+        for col in range(self.columns):
+            self.data[f'r{row1}c{col}'], self.data[f'r{row2}c{col}'] = self.data[f'r{row2}c{col}'], self.data[
+                f'r{row1}c{col}']
+
+    def transpose(self) -> None:
+        self.data = {f'r{col}c{row}': self.data[f'r{row}c{col}'] for row in range(self.rows)
+                     for col in range(self.columns)}
+        self.rows, self.columns = self.columns, self.rows
+
+    def copy(self):
+        return DictStorage(self.rows, self.columns, data=dict(self.data))
+
+
+class SparseStorage:
+    """
+    Sparse storage keeping only the cells that differ from the fill value.
+
+    Cells are kept row-compressed, as a dict of rows each mapping column to value, so
+    whole rows can be skipped or walked in one lookup. Missing cells read as the fill value.
+    """
+
+    kind = 'sparse'
+
+    def __init__(self, rows: int, columns: int, fill=None, typecode: str = None, data=None):
         """
-        Find the indices of the matrix elements based on the given row and/or column.
+        Initialize an empty storage.
+
+        Args:
+            rows (int): Number of rows.
+            columns (int): Number of columns.
+            fill: Value of every cell that is not stored.
+            typecode (str): Ignored, accepted for signature compatibility.
+            data (dict): Optional existing ``{row: {column: value}}`` mapping to adopt.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.fill = fill
+        self.typecode = None
+        self.data = data if data is not None else {}
+
+    def get(self, row: int, column: int):
+        cells = self.data.get(row)
+        if cells is None:
+            return self.fill
+        return cells.get(column, self.fill)
+
+    def set(self, row: int, column: int, value) -> None:
+        if value == self.fill:
+            cells = self.data.get(row)
+            if cells is not None:
+                cells.pop(column, None)
+                if not cells:
+                    del self.data[row]
+        else:
+            self.data.setdefault(row, {})[column] = value
+
+    def row(self, row: int) -> list:
+        result = [self.fill] * self.columns
+        for col, value in self.data.get(row, {}).items():
+            result[col] = value
+        return result
+
+    def column(self, column: int) -> list:
+        result = [self.fill] * self.rows
+        for row, cells in self.data.items():
+            if column in cells:
+                result[row] = cells[column]
+        return result
+
+    def set_row(self, row: int, values) -> None:
+        cells = {col: value for col, value in enumerate(values) if value != self.fill}
+        if cells:
+            self.data[row] = cells
+        else:
+            self.data.pop(row, None)
+
+    def fill_span(self, row: int, start: int, stop: int, value) -> None:
+        if stop <= start:
+            return
+        if value != self.fill:
+            self.data.setdefault(row, {}).update(dict.fromkeys(range(start, stop), value))
+            return
+        cells = self.data.get(row)
+        if cells is None:
+            return
+        for col in [col for col in cells if start <= col < stop]:
+            del cells[col]
+        if not cells:
+            del self.data[row]
+
+    def values(self):
+        for row in range(self.rows):
+            yield from self.row(row)
+
+    def items(self):
+        """
+        Iterate over the stored cells in row-major order.
+
+        Yields:
+            tuple: ``((row, column), value)`` for every stored cell.
+        """
+        for row in sorted(self.data):
+            cells = self.data[row]
+            for col in sorted(cells):
+                yield (row, col), cells[col]
+
+    def assign(self, values) -> None:
+        self.data = {}
+        columns = self.columns
+        for i, value in enumerate(values):
+            if value != self.fill:
+                self.data.setdefault(i // columns, {})[i % columns] = value
+
+    def to_rows(self) -> list:
+        return [self.row(row) for row in range(self.rows)]
+
+    def swap_rows(self, row1: int, row2: int) -> None:
+        first, second = self.data.pop(row1, None), self.data.pop(row2, None)
+        if first:
+            self.data[row2] = first
+        if second:
+            self.data[row1] = second
+
+    def transpose(self) -> None:
+        transposed = {}
+        for row, cells in self.data.items():
+            for col, value in cells.items():
+                transposed.setdefault(col, {})[row] = value
+        self.data = transposed
+        self.rows, self.columns = self.columns, self.rows
+
+    def copy(self):
+        return SparseStorage(self.rows, self.columns, self.fill,
+                             data={row: dict(cells) for row, cells in self.data.items()})
+
+
+class ChunkedStorage:
+    """
+    Row-major cell storage split into chunks of whole rows, shared copy-on-write.
+
+    Each chunk is a flat list (or an ``array`` when a typecode is given) of
+    ``chunk_rows`` rows. Copies and snapshots share the chunk objects and mark them as
+    shared; a shared chunk is copied right before its first write. Copying the storage
+    therefore costs O(chunks), and writes afterwards only copy the chunks they touch.
+    """
+
+    kind = 'chunked'
+
+    def __init__(self, rows: int, columns: int, fill=None, typecode: str = None, data=None):
+        """
+        Initialize the storage with every cell set to the fill value.
+
+        Args:
+            rows (int): Number of rows.
+            columns (int): Number of columns.
+            fill: Initial value of every cell.
+            typecode (str): Optional ``array`` typecode (e.g. 'd') for packed numeric chunks.
+            data (list): Optional existing chunks to adopt, treated as shared.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.typecode = typecode
+        self.chunk_rows = max(1, CHUNK_CELLS // columns) if columns else 1
+        if data is not None:
+            self.data = data
+            self.shared = [True] * len(data)
+        else:
+            self._build(repeat(fill, rows * columns))
+
+    _pack = DenseStorage._pack
+
+    def _build(self, values) -> None:
+        """
+        Replace every chunk with new, unshared chunks filled from an iterable.
+        """
+        values = iter(values)
+        size = self.chunk_rows * self.columns
+        self.data = [self._pack(islice(values, min(size, (self.rows - start) * self.columns)))
+                     for start in range(0, self.rows, self.chunk_rows)]
+        self.shared = [False] * len(self.data)
+
+    def _own(self, chunk: int):
+        """
+        Get a chunk for writing, copying it first if it is shared.
+        """
+        if self.shared[chunk]:
+            self.data[chunk] = self.data[chunk][:]
+            self.shared[chunk] = False
+        return self.data[chunk]
+
+    def share(self):
+        """
+        Get a storage sharing every chunk with this one, in O(chunks).
+
+        Returns:
+            ChunkedStorage: The copy.
+        """
+        self.shared = [True] * len(self.data)
+        storage = ChunkedStorage(self.rows, self.columns, typecode=self.typecode, data=list(self.data))
+        storage.chunk_rows = self.chunk_rows
+        return storage
+
+    def restore(self, other) -> list:
+        """
+        Take back the chunks of a storage shared from this one that differ from ours.
+
+        Chunks are compared by identity, so only the chunks written since the share are
+        replaced, and no cell is copied.
+
+        Args:
+            other (ChunkedStorage): A storage of the same shape, from ``share``.
+
+        Returns:
+            list: The indices of the chunks that changed.
+        """
+        if (self.rows, self.columns, self.chunk_rows) != (other.rows, other.columns, other.chunk_rows):
+            self.rows, self.columns, self.chunk_rows = other.rows, other.columns, other.chunk_rows
+            self.data = list(other.data)
+            self.shared = [True] * len(self.data)
+            return list(range(len(self.data)))
+        changed = [i for i, (mine, theirs) in enumerate(zip(self.data, other.data)) if mine is not theirs]
+        for i in changed:
+            self.data[i] = other.data[i]
+            self.shared[i] = True
+        return changed
+
+    def get(self, row: int, column: int):
+        chunk, local = divmod(row, self.chunk_rows)
+        return self.data[chunk][local * self.columns + column]
+
+    def set(self, row: int, column: int, value) -> None:
+        chunk, local = divmod(row, self.chunk_rows)
+        self._own(chunk)[local * self.columns + column] = value
+
+    def row(self, row: int) -> list:
+        chunk, local = divmod(row, self.chunk_rows)
+        start = local * self.columns
+        return list(self.data[chunk][start:start + self.columns])
+
+    def column(self, column: int) -> list:
+        return [value for chunk in self.data for value in chunk[column::self.columns]]
+
+    def set_row(self, row: int, values) -> None:
+        chunk, local = divmod(row, self.chunk_rows)
+        start = local * self.columns
+        self._own(chunk)[start:start + self.columns] = self._pack(values)
+
+    def fill_span(self, row: int, start: int, stop: int, value) -> None:
+        """
+        Set the cells ``start..stop-1`` of a row to the same value with one slice assignment.
+        """
+        if stop <= start:
+            return
+        chunk, local = divmod(row, self.chunk_rows)
+        offset = local * self.columns
+        self._own(chunk)[offset + start:offset + stop] = self._pack([value] * (stop - start))
+
+    def values(self):
+        return chain.from_iterable(self.data)
+
+    def assign(self, values) -> None:
+        """
+        Replace every cell, in row-major order, from an iterable.
+        """
+        self._build(list(values))
+
+    def to_rows(self) -> list:
+        return [self.row(row) for row in range(self.rows)]
+
+    def swap_rows(self, row1: int, row2: int) -> None:
+        first, second = self.row(row1), self.row(row2)
+        self.set_row(row1, second)
+        self.set_row(row2, first)
+
+    def transpose(self) -> None:
+        values = [value for col in range(self.columns) for value in self.column(col)]
+        self.rows, self.columns = self.columns, self.rows
+        self.chunk_rows = max(1, CHUNK_CELLS // self.columns) if self.columns else 1
+        self._build(values)
+
+    def copy(self):
+        return self.share()
+
+
+class ViewStorage:
+    """
+    Storage that reads and writes through to the cells of a parent matrix.
+
+    View cell ``(i, j)`` maps to parent cell ``offset + i * strides[0] + j * strides[1]``,
+    where the offset and both strides are (row, column) vectors in the parent. Writes go
+    through the parent's write methods so its caches and indexes stay up to date.
+    """
+
+    kind = 'view'
+
+    def __init__(self, parent, rows: int, columns: int, offset: tuple, strides: tuple):
+        """
+        Initialize the storage over a parent matrix.
+
+        Args:
+            parent (Matrix): The matrix owning the cells.
+            rows (int): Number of rows of the view.
+            columns (int): Number of columns of the view.
+            offset (tuple): Parent (row, column) of view cell (0, 0).
+            strides (tuple): Parent (row, column) steps for one view row and for one view column.
+        """
+        self.parent = parent
+        self.rows = rows
+        self.columns = columns
+        self.offset = offset
+        self.strides = strides
+        self.typecode = parent.storage.typecode
+
+    def locate(self, row: int, column: int) -> tuple:
+        """
+        Map view coordinates to parent coordinates.
+        """
+        (row_step_r, row_step_c), (col_step_r, col_step_c) = self.strides
+        return (self.offset[0] + row * row_step_r + column * col_step_r,
+                self.offset[1] + row * row_step_c + column * col_step_c)
+
+    def _flat_strides(self) -> tuple:
+        """
+        Get the flat buffer offset and strides of the view over a dense parent.
+        """
+        width = self.parent.storage.columns
+        (row_step_r, row_step_c), (col_step_r, col_step_c) = self.strides
+        return (self.offset[0] * width + self.offset[1], row_step_r * width + row_step_c,
+                col_step_r * width + col_step_c)
+
+    def get(self, row: int, column: int):
+        return self.parent.storage.get(*self.locate(row, column))
+
+    def set(self, row: int, column: int, value) -> None:
+        self.parent._write(*self.locate(row, column), value)
+
+    def row(self, row: int) -> list:
+        if self.parent.storage.kind == 'dense':
+            offset, row_stride, col_stride = self._flat_strides()
+            start = offset + row * row_stride
+            return list(self.parent.storage.data[start:start + col_stride * self.columns:col_stride])
+        return [self.get(row, col) for col in range(self.columns)]
+
+    def column(self, column: int) -> list:
+        if self.parent.storage.kind == 'dense':
+            offset, row_stride, col_stride = self._flat_strides()
+            start = offset + column * col_stride
+            return list(self.parent.storage.data[start:start + row_stride * self.rows:row_stride])
+        return [self.get(row, column) for row in range(self.rows)]
+
+    def set_row(self, row: int, values) -> None:
+        for col, value in enumerate(values):
+            self.set(row, col, value)
+
+    def fill_span(self, row: int, start: int, stop: int, value) -> None:
+        if stop <= start:
+            return
+        if self.strides[1] == (0, 1):
+            parent_row, parent_col = self.locate(row, start)
+            self.parent._write_span(parent_row, parent_col, parent_col + stop - start, value)
+        else:
+            for col in range(start, stop):
+                self.set(row, col, value)
+
+    def values(self):
+        for row in range(self.rows):
+            yield from self.row(row)
+
+    def assign(self, values) -> None:
+        values = iter(values)
+        for row in range(self.rows):
+            for col in range(self.columns):
+                self.set(row, col, next(values))
+
+    def to_rows(self) -> list:
+        return [self.row(row) for row in range(self.rows)]
+
+    def swap_rows(self, row1: int, row2: int) -> None:
+        first, second = self.row(row1), self.row(row2)
+        for col in range(self.columns):
+            self.set(row1, col, second[col])
+            self.set(row2, col, first[col])
+
+    def transpose(self) -> None:
+        """
+        Transpose the view by swapping its strides; the parent's cells do not move.
+        """
+        self.strides = (self.strides[1], self.strides[0])
+        self.rows, self.columns = self.columns, self.rows
+
+
+class ChangeTracker:
+    """
+    Cells and rectangles of a matrix written since the last drain.
+
+    Single cell writes are kept as coordinates. Span writes become rectangles, and a span
+    directly below the last rectangle with the same columns extends it, so a filled
+    rectangle is recorded as one rectangle. After a bulk rewrite the whole matrix is one
+    rectangle and further writes are not recorded until the next drain.
+    """
+
+    __slots__ = ('cells', 'rects', 'full')
+
+    def __init__(self):
+        self.cells = set()
+        self.rects = []
+        self.full = False
+
+    def add_span(self, row: int, start: int, stop: int) -> None:
+        """
+        Record the cells ``start..stop-1`` of a row.
+        """
+        if self.full:
+            return
+        rects = self.rects
+        if rects:
+            top, left, bottom, right = rects[-1]
+            if bottom == row - 1 and left == start and right == stop - 1:
+                rects[-1] = (top, left, row, right)
+                return
+        rects.append((row, start, row, stop - 1))
+
+    def add_rect(self, rect: tuple) -> None:
+        """
+        Record a ``(start_row, start_col, end_row, end_col)`` rectangle, ends inclusive.
+        """
+        if not self.full:
+            self.rects.append(rect)
+
+    def add_all(self, rows: int, columns: int) -> None:
+        """
+        Record that every cell of a ``rows x columns`` matrix changed.
+        """
+        self.full = True
+        self.cells = set()
+        self.rects = [(0, 0, rows - 1, columns - 1)] if rows and columns else []
+
+    def drain(self) -> tuple:
+        """
+        Get the recorded changes and start over.
+
+        Returns:
+            tuple: The changed cells (set of (row, column)) and rectangles (list).
+        """
+        changes = (self.cells, self.rects)
+        self.cells, self.rects, self.full = set(), [], False
+        return changes
+
+
+class RegionIndex:
+    """
+    Two 2D Fenwick trees over the cells of a matrix, for rectangle sums and counts that
+    stay current under writes.
+
+    One tree holds the cell values, with empty cells counting as 0, the other holds 1 for
+    every non-empty cell. Updating a cell and querying a rectangle both cost
+    O(log rows · log columns).
+    """
+
+    __slots__ = ('rows', 'columns', 'empty_index', 'sums', 'counts')
+
+    def __init__(self, rows: int, columns: int, values, empty_index):
+        """
+        Build the trees in O(rows · columns).
+
+        Args:
+            rows (int): Number of rows of the matrix.
+            columns (int): Number of columns of the matrix.
+            values (iterable): The cells in row-major order.
+            empty_index: Value of empty cells.
+        """
+        self.rows, self.columns, self.empty_index = rows, columns, empty_index
+        width = columns + 1
+        sums, counts = [0] * ((rows + 1) * width), [0] * ((rows + 1) * width)
+        for i, value in enumerate(values):
+            if value != empty_index and value is not None:
+                slot = (i // columns + 1) * width + i % columns + 1
+                sums[slot], counts[slot] = value, 1
+        for tree in (sums, counts):
+            for base in range(width, len(tree), width):
+                for col in range(1, columns + 1):
+                    parent = col + (col & -col)
+                    if parent <= columns:
+                        tree[base + parent] += tree[base + col]
+            for row in range(1, rows + 1):
+                parent = row + (row & -row)
+                if parent <= rows:
+                    source, target = row * width, parent * width
+                    tree[target:target + width] = [a + b for a, b in zip(tree[target:target + width],
+                                                                           tree[source:source + width])]
+        self.sums, self.counts = sums, counts
+
+    def move(self, row: int, column: int, old, new) -> None:
+        """
+        Account for a cell changing from ``old`` to ``new``.
+        """
+        empty = self.empty_index
+        old_empty = old == empty or old is None
+        new_empty = new == empty or new is None
+        delta = (0 if new_empty else new) - (0 if old_empty else old)
+        count = old_empty - new_empty
+        if not delta and not count:
+            return
+        sums, counts = self.sums, self.counts
+        width, rows, columns = self.columns + 1, self.rows, self.columns
+        i = row + 1
+        while i <= rows:
+            base = i * width
+            j = column + 1
+            while j <= columns:
+                sums[base + j] += delta
+                counts[base + j] += count
+                j += j & -j
+            i += i & -i
+
+    def _prefix(self, tree: list, row: int, column: int):
+        """
+        Sum the cells above ``row`` and left of ``column``.
+        """
+        width = self.columns + 1
+        total = 0
+        i = row
+        while i > 0:
+            base = i * width
+            j = column
+            while j > 0:
+                total += tree[base + j]
+                j -= j & -j
+            i -= i & -i
+        return total
+
+    def query(self, start_row: int, start_col: int, end_row: int, end_col: int, counts: bool = False):
+        """
+        Sum (or count the non-empty cells of) a rectangle with inclusive ends.
+        """
+        tree, prefix = (self.counts if counts else self.sums), self._prefix
+        return (prefix(tree, end_row + 1, end_col + 1) - prefix(tree, start_row, end_col + 1)
+                - prefix(tree, end_row + 1, start_col) + prefix(tree, start_row, start_col))
+
+
+STORAGES = {'dense': DenseStorage, 'dict': DictStorage, 'sparse': SparseStorage, 'chunked': ChunkedStorage}
+
+_parallel_pool = None
+
+NUMPY_UFUNCS = {add: numpy.add, sub: numpy.subtract, mul: numpy.multiply} if numpy is not None else {}
+
+
+def _multiply_flat(a, b, out, rows, inner, columns):
+    """
+    Multiply two row-major flat lists into a preallocated output list.
+
+    The right operand is transposed once into column lists, then the output is computed
+    in tiles of ``BLOCK_SIZE`` columns so each tile of columns is reused across every
+    row of the left operand while it is still hot.
+
+    Args:
+        a (list): Left operand, ``rows x inner``.
+        b (list): Right operand, ``inner x columns``.
+        out (list): Output buffer of ``rows x columns`` cells. Must not alias ``a`` or ``b``.
+        rows (int): Rows of the left operand.
+        inner (int): Columns of the left operand and rows of the right operand.
+        columns (int): Columns of the right operand.
+    """
+    a_rows = [a[i * inner:(i + 1) * inner] for i in range(rows)]
+    b_columns = [b[col::columns] for col in range(columns)]
+    for block in range(0, columns, BLOCK_SIZE):
+        tile = b_columns[block:block + BLOCK_SIZE]
+        stop = block + len(tile)
+        for i, row in enumerate(a_rows):
+            start = i * columns
+            out[start + block:start + stop] = [sum(map(mul, row, col)) for col in tile]
+
+
+def _choose_backend(backend: str, work: int) -> str:
+    """
+    Resolve the multiply backend for a product of the given number of multiply-adds.
+
+    Args:
+        backend (str): The requested backend, one of ``MULTIPLY_BACKENDS``.
+        work (int): Number of multiply-adds of the product.
+
+    Returns:
+        str: 'python', 'numpy' or 'parallel'.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If the 'numpy' backend is forced and NumPy is not installed.
+    """
+    if backend not in MULTIPLY_BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(MULTIPLY_BACKENDS)}")
+    if backend == 'numpy' and numpy is None:
+        raise ImportError("The 'numpy' multiply backend requires NumPy")
+    if backend != 'auto':
+        return backend
+    if numpy is not None and work >= NUMPY_THRESHOLD:
+        return 'numpy'
+    if PARALLEL_WORKERS > 1 and work >= PARALLEL_THRESHOLD:
+        return 'parallel'
+    return 'python'
+
+
+def _float_cells(storage) -> bool:
+    """
+    Whether every cell of a storage is a float, so the parallel multiply computes it exactly.
+
+    Args:
+        storage: The storage to check.
+
+    Returns:
+        bool: True for 'f' and 'd' typecodes, or untyped cells that are all floats.
+    """
+    if storage.typecode is not None:
+        return storage.typecode in 'fd'
+    return all(type(value) is float for value in storage.values())
+
+
+def _parallel_rows(names: tuple, rows: int, inner: int, columns: int, start: int, stop: int) -> None:
+    """
+    Worker of the parallel multiply: compute rows ``start..stop-1`` of the product.
+
+    Operands and result are float64 buffers in shared memory, attached by name, so
+    nothing but the names and bounds is pickled.
+    """
+    from multiprocessing import shared_memory
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    views = [memoryview(block.buf).cast('d') for block in blocks]
+    try:
+        a, b, out = views
+        product = [0.0] * ((stop - start) * columns)
+        _multiply_flat(a[start * inner:stop * inner].tolist(), b[:inner * columns].tolist(), product,
+                       stop - start, inner, columns)
+        out[start * columns:stop * columns] = array('d', product)
+    finally:
+        for view in views:
+            view.release()
+        for block in blocks:
+            block.close()
+
+
+def _parallel_multiply(a, b, rows: int, inner: int, columns: int, workers: int):
+    """
+    Multiply two row-major flat operands by splitting the result rows across processes.
+
+    Both operands are copied once into ``multiprocessing.shared_memory`` and each worker
+    writes its row block straight into a shared result buffer.
+
+    Args:
+        a (array): Left operand values as ``array('d')``, ``rows x inner``.
+        b (array): Right operand values as ``array('d')``, ``inner x columns``.
+        rows (int): Rows of the left operand.
+        inner (int): Columns of the left operand and rows of the right operand.
+        columns (int): Columns of the right operand.
+        workers (int): Number of worker processes.
+
+    Returns:
+        array: The ``rows x columns`` product as an ``array('d')``.
+    """
+    global _parallel_pool
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    if not (rows and inner and columns):
+        return array('d', bytes(8 * rows * columns))
+    if _parallel_pool is None or _parallel_pool._max_workers != workers:
+        if _parallel_pool is not None:
+            _parallel_pool.shutdown()
+        _parallel_pool = ProcessPoolExecutor(workers)
+    blocks = [shared_memory.SharedMemory(create=True, size=max(8 * size, 8))
+              for size in (len(a), len(b), rows * columns)]
+    try:
+        for block, values in zip(blocks, (a, b)):
+            block.buf[:8 * len(values)] = memoryview(values).cast('B')
+        names = tuple(block.name for block in blocks)
+        step = -(-rows // workers)
+        futures = [_parallel_pool.submit(_parallel_rows, names, rows, inner, columns, start, min(start + step, rows))
+                   for start in range(0, rows, step)]
+        for future in futures:
+            future.result()
+        result = array('d')
+        result.frombytes(blocks[2].buf[:8 * rows * columns])
+        return result
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _dot2(a0, a1, b0, b1):
+    return a0 * b0 + a1 * b1
+
+
+def _dot3(a0, a1, a2, b0, b1, b2):
+    return a0 * b0 + a1 * b1 + a2 * b2
+
+
+def _dot4(a0, a1, a2, a3, b0, b1, b2, b3):
+    return a0 * b0 + a1 * b1 + a2 * b2 + a3 * b3
+
+
+def _det2(a, b, c, d):
+    return a * d - b * c
+
+
+def _det3(a, b, c, d, e, f, g, h, i):
+    return a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+
+
+def _det4(a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33):
+    return ((a00 * a11 - a10 * a01) * (a22 * a33 - a32 * a23)
+            - (a00 * a12 - a10 * a02) * (a21 * a33 - a31 * a23)
+            + (a00 * a13 - a10 * a03) * (a21 * a32 - a31 * a22)
+            + (a01 * a12 - a11 * a02) * (a20 * a33 - a30 * a23)
+            - (a01 * a13 - a11 * a03) * (a20 * a32 - a30 * a22)
+            + (a02 * a13 - a12 * a03) * (a20 * a31 - a30 * a21))
+
+
+def _adjugate2(a, b, c, d):
+    return d, -b, -c, a, a * d - b * c
+
+
+def _adjugate3(a, b, c, d, e, f, g, h, i):
+    b00, b10, b20 = e * i - f * h, f * g - d * i, d * h - e * g
+    return (b00, c * h - b * i, b * f - c * e,
+            b10, a * i - c * g, c * d - a * f,
+            b20, b * g - a * h, a * e - b * d,
+            a * b00 + b * b10 + c * b20)
+
+
+def _adjugate4(a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33):
+    s0, s1, s2 = a00 * a11 - a10 * a01, a00 * a12 - a10 * a02, a00 * a13 - a10 * a03
+    s3, s4, s5 = a01 * a12 - a11 * a02, a01 * a13 - a11 * a03, a02 * a13 - a12 * a03
+    c0, c1, c2 = a20 * a31 - a30 * a21, a20 * a32 - a30 * a22, a20 * a33 - a30 * a23
+    c3, c4, c5 = a21 * a32 - a31 * a22, a21 * a33 - a31 * a23, a22 * a33 - a32 * a23
+    return (a11 * c5 - a12 * c4 + a13 * c3, a02 * c4 - a01 * c5 - a03 * c3,
+            a31 * s5 - a32 * s4 + a33 * s3, a22 * s4 - a21 * s5 - a23 * s3,
+            a12 * c2 - a10 * c5 - a13 * c1, a00 * c5 - a02 * c2 + a03 * c1,
+            a32 * s2 - a30 * s5 - a33 * s1, a20 * s5 - a22 * s2 + a23 * s1,
+            a10 * c4 - a11 * c2 + a13 * c0, a01 * c2 - a00 * c4 - a03 * c0,
+            a30 * s4 - a31 * s2 + a33 * s0, a21 * s2 - a20 * s4 - a23 * s0,
+            a11 * c1 - a10 * c3 - a12 * c0, a00 * c3 - a01 * c1 + a02 * c0,
+            a31 * s1 - a30 * s3 - a32 * s0, a20 * s3 - a21 * s1 + a22 * s0,
+            s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0)
+
+
+def _edge_index(i: int, n: int, edge: str):
+    """
+    Map a row or column index that may fall outside ``0..n-1`` to the index it reads
+    under an edge mode, or None for the fill value of 'constant'.
+    """
+    if 0 <= i < n:
+        return i
+    if edge == 'constant':
+        return None
+    if edge == 'wrap':
+        return i % n
+    if edge == 'nearest' or n == 1:
+        return 0 if i < 0 else n - 1
+    period = 2 * (n - 1)
+    i %= period
+    return i if i < n else period - i
+
+
+def _multiply2(a, b):
+    a00, a01, a10, a11 = a
+    b00, b01, b10, b11 = b
+    return [
+        a00 * b00 + a01 * b10,
+        a00 * b01 + a01 * b11,
+        a10 * b00 + a11 * b10,
+        a10 * b01 + a11 * b11]
+
+
+def _multiply3(a, b):
+    a00, a01, a02, a10, a11, a12, a20, a21, a22 = a
+    b00, b01, b02, b10, b11, b12, b20, b21, b22 = b
+    return [
+        a00 * b00 + a01 * b10 + a02 * b20,
+        a00 * b01 + a01 * b11 + a02 * b21,
+        a00 * b02 + a01 * b12 + a02 * b22,
+        a10 * b00 + a11 * b10 + a12 * b20,
+        a10 * b01 + a11 * b11 + a12 * b21,
+        a10 * b02 + a11 * b12 + a12 * b22,
+        a20 * b00 + a21 * b10 + a22 * b20,
+        a20 * b01 + a21 * b11 + a22 * b21,
+        a20 * b02 + a21 * b12 + a22 * b22]
+
+
+def _multiply4(a, b):
+    a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = a
+    b00, b01, b02, b03, b10, b11, b12, b13, b20, b21, b22, b23, b30, b31, b32, b33 = b
+    return [
+        a00 * b00 + a01 * b10 + a02 * b20 + a03 * b30,
+        a00 * b01 + a01 * b11 + a02 * b21 + a03 * b31,
+        a00 * b02 + a01 * b12 + a02 * b22 + a03 * b32,
+        a00 * b03 + a01 * b13 + a02 * b23 + a03 * b33,
+        a10 * b00 + a11 * b10 + a12 * b20 + a13 * b30,
+        a10 * b01 + a11 * b11 + a12 * b21 + a13 * b31,
+        a10 * b02 + a11 * b12 + a12 * b22 + a13 * b32,
+        a10 * b03 + a11 * b13 + a12 * b23 + a13 * b33,
+        a20 * b00 + a21 * b10 + a22 * b20 + a23 * b30,
+        a20 * b01 + a21 * b11 + a22 * b21 + a23 * b31,
+        a20 * b02 + a21 * b12 + a22 * b22 + a23 * b32,
+        a20 * b03 + a21 * b13 + a22 * b23 + a23 * b33,
+        a30 * b00 + a31 * b10 + a32 * b20 + a33 * b30,
+        a30 * b01 + a31 * b11 + a32 * b21 + a33 * b31,
+        a30 * b02 + a31 * b12 + a32 * b22 + a33 * b32,
+        a30 * b03 + a31 * b13 + a32 * b23 + a33 * b33]
+
+
+# Closed-form kernels by size, shared with BatchMatrix. Each dot kernel takes the n
+# cells of a row then the n cells of a column; each determinant kernel the n * n cells
+# in row-major order.
+DOT_KERNELS = {2: _dot2, 3: _dot3, 4: _dot4}
+DETERMINANT_KERNELS = {2: _det2, 3: _det3, 4: _det4}
+# Each multiplies two row-major flat lists of the same size.
+_MULTIPLY = {2: _multiply2, 3: _multiply3, 4: _multiply4}
+# Each returns the adjugate cells in row-major order followed by the determinant.
+ADJUGATE_KERNELS = {2: _adjugate2, 3: _adjugate3, 4: _adjugate4}
+# Row-major index of each cell of the transpose.
+_TRANSPOSE = {n: [col * n + row for row in range(n) for col in range(n)] for n in SMALL_SIZES}
+
+
+class MatrixSnapshot:
+    """
+    An immutable copy of the cells of a matrix, from ``Matrix.snapshot``.
+
+    Snapshots of chunked matrices share every chunk with the matrix they were taken
+    from; the matrix copies a chunk the first time it writes to it afterwards, so each
+    snapshot only costs the chunks written since. Snapshots of other backends hold a
+    full copy of the storage.
+    """
+
+    def __init__(self, matrix):
+        """
+        Capture the current cells of a matrix.
+
+        Args:
+            matrix (Matrix): The matrix to capture.
+        """
+        self.rows = matrix.rows
+        self.columns = matrix.columns
+        self.empty_index = matrix.empty_index
+        storage = matrix.storage
+        self._storage = storage.share() if storage.kind == 'chunked' else matrix.copy().storage
+
+    def get(self, row: int, column: int):
+        """
+        Get the value of a cell as it was when the snapshot was taken.
 
         Args:
             row (int): The row index.
             column (int): The column index.
 
         Returns:
-            list: A list of keys representing the indices.
+            The cell value.
+
+        Raises:
+            IndexError: If the coordinates are out of range.
         """
-        if not isnan(row) and isnan(column):
-            return [key for key in self.data if key.startswith(f'r{row}')]
-        if not isnan(column) and isnan(row):
-            return [key for key in self.data if key.endswith(f'c{column}')]
-        if not isnan(row) and not isnan(column):
-            return [f'r{row}c{column}']
-        return list(self.data.keys())
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            raise IndexError(f"Index ({row}, {column}) is out of range for a {self.rows}x{self.columns} snapshot")
+        return self._storage.get(row, column)
+
+    def row(self, row: int) -> list:
+        """
+        Get a copy of a row of the snapshot.
+        """
+        return self._storage.row(row)
+
+    def column(self, column: int) -> list:
+        """
+        Get a copy of a column of the snapshot.
+        """
+        return self._storage.column(column)
+
+    def to_matrix(self):
+        """
+        Create a matrix holding the cells of the snapshot.
+
+        Chunked snapshots give a chunked matrix that shares the chunks copy-on-write.
+
+        Returns:
+            Matrix: The new matrix.
+        """
+        storage = self._storage
+        result = Matrix(0, 0, storage.kind, storage.typecode, self.empty_index)
+        result.rows, result.columns = self.rows, self.columns
+        result.storage = storage.copy()
+        return result
+
+
+class Matrix:
+    """
+    A class to represent a matrix and perform various matrix operations.
+
+    Rows and columns are indexed from 0. Cells are kept in a storage backend chosen at
+    construction: ``'dense'`` (default) keeps them in one contiguous row-major buffer,
+    ``'sparse'`` only keeps cells that differ from the empty index, ``'chunked'`` splits
+    the buffer into row bands shared copy-on-write between copies and snapshots, and
+    ``'dict'`` keeps the original ``'r{row}c{column}'`` dict layout for compatibility.
+
+    Sparse-aware kernels treat empty cells as zero.
+    """
+
+    def __init__(self, rows: int = 10, columns: int = 10, storage: str = 'dense', typecode: str = None,
+                 empty_index=None):
+        """
+        Initialize the matrix with the given number of rows and columns.
+
+        Args:
+            rows (int): Number of rows in the matrix.
+            columns (int): Number of columns in the matrix.
+            storage (str): Storage backend, 'dense', 'sparse', 'dict' or 'chunked'.
+            typecode (str): Optional ``array`` typecode for a packed numeric dense buffer.
+                The empty index then defaults to 0 since arrays cannot hold None.
+            empty_index: Value of empty cells.
+
+        Raises:
+            ValueError: If the storage backend is unknown.
+        """
+        if storage not in STORAGES:
+            raise ValueError(f"Unknown storage '{storage}', expected one of {', '.join(STORAGES)}")
+        if empty_index is None and typecode is not None:
+            empty_index = 0.0 if typecode in 'fd' else 0
+        self.rows = rows
+        self.columns = columns
+        self.empty_index = empty_index
+        self.storage = STORAGES[storage](rows, columns, empty_index, typecode)
+        self._lu = None
+        self._value_index = None
+        self._changes = None
+        self._sat = None
+        self._regions = None
+        self._mmap = None
+        self._path = None
+
+    @classmethod
+    def from_buffer(cls, buffer, rows: int, columns: int, typecode: str = None):
+        """
+        Wrap an existing buffer as a dense matrix without copying it.
+
+        The matrix reads and writes the buffer directly, so changes show up on both sides.
+        The buffer must be C-contiguous and hold exactly ``rows * columns`` cells. After
+        writing through the buffer, call ``invalidate`` so cached results are not reused.
+
+        Args:
+            buffer: Any object supporting the buffer protocol (array, bytearray, mmap, NumPy array...).
+            rows (int): Number of rows in the matrix.
+            columns (int): Number of columns in the matrix.
+            typecode (str): Cell typecode, defaults to the format of the buffer.
+
+        Returns:
+            Matrix: The matrix sharing memory with the buffer.
+
+        Raises:
+            ValueError: If the typecode is unsupported or the buffer has the wrong size.
+        """
+        view = memoryview(buffer)
+        typecode = typecode or view.format
+        if typecode not in BUFFER_TYPECODES:
+            raise ValueError(f"Unsupported buffer typecode '{typecode}', expected one of '{BUFFER_TYPECODES}'")
+        if view.format != typecode or view.ndim != 1:
+            view = view.cast('B').cast(typecode)
+        if len(view) != rows * columns:
+            raise ValueError(f"Buffer holds {len(view)} cells, expected {rows * columns}")
+        matrix = cls(0, 0, typecode=typecode)
+        matrix.rows, matrix.columns = rows, columns
+        matrix.storage = DenseStorage(rows, columns, matrix.empty_index, typecode, data=view)
+        return matrix
+
+    @classmethod
+    def from_numpy(cls, values):
+        """
+        Wrap a 2D NumPy array as a dense matrix, sharing its memory.
+
+        Non C-contiguous arrays (e.g. transposed or strided views) are copied first.
+        After writing through the array, call ``invalidate`` so cached results are not reused.
+
+        Args:
+            values (numpy.ndarray): The 2D array to wrap.
+
+        Returns:
+            Matrix: The matrix sharing memory with the array.
+
+        Raises:
+            ValueError: If the array is not 2D or its dtype has no array typecode.
+        """
+        if values.ndim != 2:
+            raise ValueError("Only 2D arrays can be wrapped as a matrix")
+        values = numpy.ascontiguousarray(values)
+        return cls.from_buffer(values, values.shape[0], values.shape[1], values.dtype.char)
+
+    def save(self, path: str, typecode: str = None) -> None:
+        """
+        Save the matrix to a binary matrix file that ``Matrix.open`` can memory-map.
+
+        The file is a fixed size header (magic, version, typecode, byte order, rows,
+        columns) followed by the raw cells in row-major order. Rows are written one at a
+        time, so saving does not need a second copy of the matrix in memory. Empty cells
+        are written as 0.
+
+        Args:
+            path (str): The file to write.
+            typecode (str): Cell typecode, defaults to the dense typecode or 'd'.
+
+        Raises:
+            ValueError: If the typecode is unsupported.
+        """
+        typecode = typecode or self.storage.typecode or 'd'
+        if typecode not in BUFFER_TYPECODES:
+            raise ValueError(f"Unsupported file typecode '{typecode}', expected one of '{BUFFER_TYPECODES}'")
+        if self._mmap is not None and os.path.exists(path) and os.path.samefile(path, self._path):
+            self.flush()
+            return
+        header = FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, typecode.encode(), sys.byteorder[0].encode(),
+                                  self.rows, self.columns)
+        empty = self.empty_index
+        with open(path, 'wb') as file:
+            file.write(header.ljust(FILE_HEADER_SIZE, b'\0'))
+            if self.storage.kind == 'dense' and self.storage.typecode == typecode:
+                file.write(memoryview(self.storage.data).cast('B'))
+                return
+            for row in range(self.rows):
+                file.write(array(typecode, [0 if value == empty else value for value in self.storage.row(row)]))
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'r'):
+        """
+        Open a matrix file written by ``save`` as a memory-mapped dense matrix.
+
+        Cells are paged in from disk on demand, so the file can be larger than memory.
+        In 'r+' mode writes go straight to the mapping and reach the file without
+        rewriting it; call ``flush`` to force them to disk and ``close`` when done.
+
+        Args:
+            path (str): The file to open.
+            mode (str): 'r' for read-only or 'r+' for read-write.
+
+        Returns:
+            Matrix: The memory-mapped matrix.
+
+        Raises:
+            ValueError: If the mode is unknown or the file is not a compatible matrix file.
+        """
+        if mode not in ('r', 'r+'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'r' or 'r+'")
+        with open(path, 'rb' if mode == 'r' else 'r+b') as file:
+            header = file.read(FILE_HEADER.size)
+            if len(header) < FILE_HEADER.size:
+                raise ValueError(f"'{path}' is truncated")
+            magic, version, typecode, byteorder, rows, columns = FILE_HEADER.unpack(header)
+            if magic != FILE_MAGIC or version != FILE_VERSION:
+                raise ValueError(f"'{path}' is not a matrix file")
+            typecode, byteorder = typecode.decode(), byteorder.decode()
+            if byteorder != sys.byteorder[0]:
+                raise ValueError(f"'{path}' was saved with a different byte order")
+            size = rows * columns * array(typecode).itemsize
+            if os.fstat(file.fileno()).st_size < FILE_HEADER_SIZE + size:
+                raise ValueError(f"'{path}' is truncated")
+            mapping = mmap.mmap(file.fileno(), FILE_HEADER_SIZE + size,
+                                access=mmap.ACCESS_READ if mode == 'r' else mmap.ACCESS_WRITE)
+        view = memoryview(mapping)[FILE_HEADER_SIZE:].cast(typecode)
+        matrix = cls.from_buffer(view, rows, columns, typecode)
+        matrix._mmap = mapping
+        matrix._path = path
+        return matrix
+
+    def flush(self) -> None:
+        """
+        Write pending changes of a memory-mapped matrix to its file. No-op for other matrices.
+        """
+        if self._mmap is not None and not self._mmap.closed:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        """
+        Flush and unmap a memory-mapped matrix. The matrix must not be used afterwards.
+        """
+        if self._mmap is None:
+            return
+        self.flush()
+        self.storage.data.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def to_numpy(self):
+        """
+        Get the cells as a 2D NumPy array.
+
+        Dense matrices with a typecode share memory with the returned array; any other
+        storage is copied. After writing through a shared array, call ``invalidate`` so
+        cached results are not reused.
+
+        Returns:
+            numpy.ndarray: The ``rows x columns`` array.
+        """
+        if self.storage.kind == 'dense' and self.storage.typecode is not None:
+            return numpy.frombuffer(self.storage.data, dtype=self.storage.typecode).reshape(self.rows, self.columns)
+        values = self.storage.data if self.storage.kind == 'dense' else list(self.storage.values())
+        return numpy.array(values).reshape(self.rows, self.columns)
+
+    def __array__(self, dtype=None, copy=None):
+        """
+        NumPy array protocol, so ``numpy.asarray(matrix)`` works without copying when possible.
+        """
+        values = self.to_numpy()
+        if copy:
+            values = values.copy()
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def buffer(self) -> memoryview:
+        """
+        Get a memoryview sharing memory with the dense storage, on every Python version.
+        After writing through it, call ``invalidate`` so cached results are not reused.
+
+        Returns:
+            memoryview: The flat row-major cells, with the storage's typecode as format.
+
+        Raises:
+            TypeError: If the matrix is not dense with a typecode.
+        """
+        if self.storage.kind != 'dense' or self.storage.typecode is None:
+            raise TypeError("Only dense matrices with a typecode export a buffer")
+        return memoryview(self.storage.data)
+
+    def __buffer__(self, flags):
+        """
+        Buffer protocol export (PEP 688), so ``memoryview(matrix)`` shares memory.
+
+        Python only honours ``__buffer__`` from 3.12; on older versions
+        ``memoryview(matrix)`` raises TypeError, so use ``buffer()`` or ``to_numpy()``.
+
+        Raises:
+            TypeError: If the matrix is not dense with a typecode.
+        """
+        return self.buffer()
+
+    @property
+    def data(self):
+        """
+        The raw cell container of the storage backend: a flat row-major list or array for
+        dense storage, a ``'r{row}c{column}'`` keyed dict for dict storage, a list of
+        row-band chunks for chunked storage.
+        """
+        return self.storage.data
+
+    @data.setter
+    def data(self, value):
+        self.storage.data = value
+        self._changed()
+
+    def _like(self, rows: int, columns: int):
+        """
+        Create an empty matrix with the same storage backend and empty index as this one.
+
+        Args:
+            rows (int): Number of rows of the new matrix.
+            columns (int): Number of columns of the new matrix.
+
+        Returns:
+            Matrix: The new matrix.
+        """
+        return Matrix(rows, columns, self.storage.kind, self.storage.typecode, self.empty_index)
+
+    def _check_index(self, row: int, column: int) -> None:
+        """
+        Raise an IndexError if the coordinates fall outside of the matrix.
+        """
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            raise IndexError(f"Index ({row}, {column}) is out of range for a {self.rows}x{self.columns} matrix")
+
+    def _check_row(self, row: int) -> None:
+        """
+        Raise an IndexError if the row falls outside of the matrix.
+        """
+        if not 0 <= row < self.rows:
+            raise IndexError(f"Row {row} is out of range for a {self.rows}x{self.columns} matrix")
+
+    def _check_column(self, column: int) -> None:
+        """
+        Raise an IndexError if the column falls outside of the matrix.
+        """
+        if not 0 <= column < self.columns:
+            raise IndexError(f"Column {column} is out of range for a {self.rows}x{self.columns} matrix")
+
+    @staticmethod
+    def _parse_key(key):
+        """
+        Convert a ``'r{row}c{column}'`` key or a ``(row, column)`` tuple to coordinates.
+
+        Args:
+            key: The key to convert.
+
+        Returns:
+            tuple: The (row, column) coordinates.
+        """
+        if isinstance(key, str):
+            row, column = key[1:].split('c')
+            return int(row), int(column)
+        return key
+
+    def invalidate(self, region: tuple = None) -> None:
+        """
+        Drop or rebuild the cached LU factors, indexes and change tracking after the cells
+        were written behind the matrix's back, through a buffer or NumPy array sharing its
+        memory (``from_buffer``, ``from_numpy``, ``to_numpy``, ``buffer``).
+
+        Args:
+            region (tuple): The written ``(start_row, start_col, end_row, end_col)``
+                rectangle, ends inclusive. None for the whole matrix.
+        """
+        self._changed(region)
+
+    def _changed(self, region: tuple = None) -> None:
+        """
+        Drop or rebuild everything derived from the cell values after a bulk rewrite.
+        Single cells and spans are written through ``_write`` and ``_write_span`` instead,
+        which keep the derived state up to date incrementally.
+
+        Args:
+            region (tuple): The rewritten ``(start_row, start_col, end_row, end_col)``
+                rectangle, ends inclusive, for change tracking. None for the whole matrix.
+        """
+        self._lu = None
+        self._sat = None
+        if self._value_index is not None:
+            self._value_index = self._build_value_index()
+        if self._regions is not None:
+            self._regions = RegionIndex(self.rows, self.columns, self.storage.values(), self.empty_index)
+        if self._changes is not None:
+            if region is None:
+                self._changes.add_all(self.rows, self.columns)
+            else:
+                self._changes.add_rect(region)
+
+    def _write(self, row: int, column: int, value) -> None:
+        """
+        Write one cell, keeping the value and region indexes up to date.
+        """
+        if self._value_index is not None:
+            self._index_move(self.storage.get(row, column), value, (row, column))
+        if self._regions is not None:
+            self._regions.move(row, column, self.storage.get(row, column), value)
+        self.storage.set(row, column, value)
+        self._lu = None
+        self._sat = None
+        changes = self._changes
+        if changes is not None and not changes.full:
+            changes.cells.add((row, column))
+
+    def _write_span(self, row: int, start: int, stop: int, value) -> None:
+        """
+        Write the cells ``start..stop-1`` of a row with the same value, keeping the value
+        and region indexes up to date.
+        """
+        index = self._value_index
+        if index is not None:
+            for col, old in enumerate(self.storage.row(row)[start:stop], start):
+                self._index_move(old, self.empty_index, (row, col))
+            if value != self.empty_index:
+                index.setdefault(value, set()).update((row, col) for col in range(start, stop))
+        regions = self._regions
+        if regions is not None:
+            for col, old in enumerate(self.storage.row(row)[start:stop], start):
+                regions.move(row, col, old, value)
+        self.storage.fill_span(row, start, stop, value)
+        self._lu = None
+        self._sat = None
+        if self._changes is not None:
+            self._changes.add_span(row, start, stop)
+
+    def _index_move(self, old, new, coordinates: tuple) -> None:
+        """
+        Move a cell from the index entry of its old value to the one of its new value.
+        Empty cells are not indexed.
+        """
+        index = self._value_index
+        if old != self.empty_index:
+            cells = index.get(old)
+            if cells is not None:
+                cells.discard(coordinates)
+                if not cells:
+                    del index[old]
+        if new != self.empty_index:
+            index.setdefault(new, set()).add(coordinates)
+
+    def _build_value_index(self) -> dict:
+        """
+        Build the inverted value index from scratch.
+
+        Returns:
+            dict: ``{value: {(row, column), ...}}`` for every non-empty value.
+        """
+        index = {}
+        for coordinates, value in self.items():
+            index.setdefault(value, set()).add(coordinates)
+        return index
+
+    def enable_value_index(self) -> None:
+        """
+        Maintain an inverted index from value to coordinates so ``find`` costs O(matches).
+
+        Every write keeps the index up to date, so enable it on matrices that are queried
+        more often than they are bulk rewritten. Cell values must be hashable.
+        """
+        if self._value_index is None:
+            self._value_index = self._build_value_index()
+
+    def disable_value_index(self) -> None:
+        """
+        Drop the inverted value index.
+        """
+        self._value_index = None
+
+    def enable_region_index(self) -> None:
+        """
+        Maintain 2D Fenwick trees so ``region_sum`` and ``region_count`` cost
+        O(log rows · log columns) on a matrix that keeps being written.
+
+        Every cell write then costs O(log rows · log columns) too. Static matrices do not
+        need it: their queries use a summed-area table built on the first query. Cells must
+        be numbers; empty cells count as 0.
+        """
+        if self._regions is None:
+            self._regions = RegionIndex(self.rows, self.columns, self.storage.values(), self.empty_index)
+
+    def disable_region_index(self) -> None:
+        """
+        Drop the Fenwick trees.
+        """
+        self._regions = None
+
+    def enable_change_tracking(self) -> None:
+        """
+        Start recording which cells are written, for ``drain_changes``.
+
+        Tracking costs one set insertion per written cell and one tuple per written span,
+        so it can stay on for matrices that are redrawn incrementally.
+        """
+        if self._changes is None:
+            self._changes = ChangeTracker()
+
+    def disable_change_tracking(self) -> None:
+        """
+        Stop recording changes and drop the ones not drained yet.
+        """
+        self._changes = None
+
+    def drain_changes(self) -> tuple:
+        """
+        Get the changes recorded since change tracking was enabled or last drained.
+
+        Cells written one at a time are returned as coordinates. Spans, fills and bulk
+        rewrites are returned as ``(start_row, start_col, end_row, end_col)`` rectangles
+        with inclusive ends, so ``matrix.view(*rect)`` is the changed area. Rows filled
+        one below the other with the same columns are coalesced into one rectangle, and a
+        bulk rewrite (arithmetic into the matrix, ``transpose``, assigning ``data``)
+        replaces everything with one rectangle covering the matrix. A cell may be reported
+        both as a coordinate and inside a rectangle.
+
+        Returns:
+            tuple: The set of changed (row, column) cells and the list of changed rectangles.
+
+        Raises:
+            ValueError: If change tracking is not enabled.
+        """
+        if self._changes is None:
+            raise ValueError("Change tracking is not enabled, call enable_change_tracking() first")
+        return self._changes.drain()
+
+    def find_index(self, row: int = nan, column: int = nan):
+        """
+        Find the indices of the matrix elements based on the given row and/or column.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+
+        Returns:
+            list: A list of (row, column) coordinates.
+        """
+        if not isnan(row) and isnan(column):
+            return [(row, col) for col in range(self.columns)]
+        if not isnan(column) and isnan(row):
+            return [(r, column) for r in range(self.rows)]
+        if not isnan(row) and not isnan(column):
+            return [(row, column)]
+        return [(r, col) for r in range(self.rows) for col in range(self.columns)]
+
+    def middle(self):
+        """
+        Get the middle index of the matrix.
+
+        Returns:
+            tuple: The middle index (row, column).
+        """
+        return (self.rows - 1) // 2, (self.columns - 1) // 2
+
+    def get_middle(self):
+        """
+        Get the value of the middle element of the matrix.
+
+        Returns:
+            int: The value of the middle element.
+        """
+        return self.storage.get(*self.middle())
+
+    def find(self, value) -> list:
+        """
+        Find the indices of the matrix elements that match the given value.
+
+        Uses the value index when it is enabled, otherwise scans every cell.
+
+        Args:
+            value: The value to search for.
+
+        Returns:
+            list: A list of (row, column) coordinates of matching elements, in row-major order.
+        """
+        if self._value_index is not None and value != self.empty_index:
+            return sorted(self._value_index.get(value, ()))
+        columns = self.columns
+        return [divmod(i, columns) for i, val in enumerate(self.storage.values()) if val == value]
+
+    def get(self, row: int = nan, column: int = nan):
+        """
+        Get the values of the matrix elements based on the given row and/or column.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+
+        Returns:
+            The value of the element when both indices are given, otherwise a list of the
+            values in the row, the column or the whole matrix.
+
+        Raises:
+            IndexError: If a given index is out of range.
+        """
+        if not isnan(row) and not isnan(column):
+            self._check_index(row, column)
+            return self.storage.get(row, column)
+        if not isnan(row):
+            self._check_row(row)
+            return self.storage.row(row)
+        if not isnan(column):
+            self._check_column(column)
+            return self.storage.column(column)
+        return list(self.storage.values())
+
+    def __getitem__(self, key):
+        """
+        Get the value of a matrix element at the given key.
+
+        Args:
+            key: A ``'r{row}c{column}'`` key or a ``(row, column)`` tuple.
+
+        Returns:
+            The value of the element.
+        """
+        row, column = self._parse_key(key)
+        self._check_index(row, column)
+        return self.storage.get(row, column)
+
+    def __setitem__(self, key, value):
+        """
+        Set the value of a matrix element at the given key.
+
+        Args:
+            key: A ``'r{row}c{column}'`` key or a ``(row, column)`` tuple.
+            value: The value to set.
+        """
+        row, column = self._parse_key(key)
+        self._check_index(row, column)
+        self._write(row, column, value)
+
+    def insert(self, value, row: int = nan, column: int = nan) -> None:
+        """
+        Insert a value into the matrix at the specified row and/or column.
+
+        Args:
+            value: The value to insert.
+            row (int): The row index.
+            column (int): The column index.
+
+        Raises:
+            IndexError: If a given index is out of range.
+        """
+        if not isnan(row) and not isnan(column):
+            self._check_index(row, column)
+            self._write(row, column, value)
+        elif not isnan(row):
+            self._check_row(row)
+            self._write_span(row, 0, self.columns, value)
+        elif not isnan(column):
+            self._check_column(column)
+            for r in range(self.rows):
+                self._write(r, column, value)
+        else:
+            for r in range(self.rows):
+                self._write_span(r, 0, self.columns, value)
+
+    def row(self, row: int = nan) -> list:
+        """
+        Get the values of the elements in the specified row.
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            list: A list of values in the specified row.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        return self.get(row=row)
+
+    def column(self, column: int = nan) -> list:
+        """
+        Get the values of the elements in the specified column.
+
+        Args:
+            column (int): The column index.
+
+        Returns:
+            list: A list of values in the specified column.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        return self.get(column=column)
+
+    def delete(self, row: int = nan, column: int = nan) -> None:
+        """
+        Delete the values of the elements in the specified row and/or column by setting them to the empty index.
+
+        Args:
+            row (int): The row index.
+            column (int): The column index.
+
+        Raises:
+            IndexError: If a given index is out of range.
+        """
+        self.insert(self.empty_index, row, column)
+
+    def print(self) -> None:
+        """
+        Print the matrix row by row.
+        """
+        for row in range(self.rows):
+            print(self.row(row))
+
+    def _fill_span_clipped(self, value, row: int, start: int, stop: int) -> None:
+        """
+        Fill the cells ``start..stop-1`` of a row, clipped to the matrix, with one span write.
+        """
+        if 0 <= row < self.rows:
+            start, stop = max(start, 0), min(stop, self.columns)
+            if start < stop:
+                self._write_span(row, start, stop, value)
+
+    def fill_rect(self, value, pos: tuple = (0, 0), area: tuple = None):
+        """
+        Fill a rectangular area of the matrix with the specified value.
+
+        The rectangle is clipped to the matrix once, then filled one row span at a time.
+
+        Args:
+            value: The value to fill.
+            pos (tuple): The starting position (row, column) of the rectangle.
+            area (tuple): The size (rows, columns) of the rectangle.
+        """
+        if area is None:
+            area = (self.rows, self.columns)
+        start, stop = max(pos[1], 0), min(pos[1] + area[1], self.columns)
+        if start >= stop:
+            return
+        for row in range(max(pos[0], 0), min(pos[0] + area[0], self.rows)):
+            self._write_span(row, start, stop, value)
+
+    def fill_circ(self, center, radius, value):
+        """
+        Fill a circular area of the matrix with the specified value.
+
+        Cells with ``(row - center_row)² + (col - center_col)² <= radius²`` are filled. The
+        half-width of each scanline is found with an integer midpoint walk, so no cell of
+        the bounding box is tested individually.
+
+        Args:
+            center (tuple): The center (row, column) of the circle.
+            radius (int): The radius of the circle.
+            value: The value to fill.
+        """
+        if radius < 0:
+            return
+        center_row, center_col = center
+        radius_sq = radius * radius
+        half = radius
+        for dy in range(radius + 1):
+            while half * half + dy * dy > radius_sq:
+                half -= 1
+            self._fill_span_clipped(value, center_row + dy, center_col - half, center_col + half + 1)
+            if dy:
+                self._fill_span_clipped(value, center_row - dy, center_col - half, center_col + half + 1)
+
+    def fill_line(self, value, start: tuple, end: tuple):
+        """
+        Draw a one cell wide line between two cells with the specified value.
+
+        Cells are chosen with Bresenham's algorithm, and consecutive cells on the same
+        row are written as one span.
+
+        Args:
+            value: The value to fill.
+            start (tuple): The first end point (row, column).
+            end (tuple): The second end point (row, column).
+        """
+        row, col = round(start[0]), round(start[1])
+        end_row, end_col = round(end[0]), round(end[1])
+        d_col, d_row = abs(end_col - col), -abs(end_row - row)
+        step_col = 1 if col < end_col else -1
+        step_row = 1 if row < end_row else -1
+        error = d_col + d_row
+        span_start = col
+        while True:
+            if row == end_row and col == end_col:
+                self._fill_span_clipped(value, row, min(span_start, col), max(span_start, col) + 1)
+                return
+            doubled = 2 * error
+            if doubled >= d_row:
+                error += d_row
+                col += step_col
+            if doubled <= d_col:
+                previous = col - step_col if doubled >= d_row else col
+                self._fill_span_clipped(value, row, min(span_start, previous), max(span_start, previous) + 1)
+                error += d_col
+                row += step_row
+                span_start = col
+
+    def fill_polygon(self, value, points):
+        """
+        Fill a polygon, including its outline, with the specified value.
+
+        Each row is intersected with the polygon edges (even-odd rule) and filled between
+        pairs of crossings with span writes. Self-intersecting polygons are supported.
+        The outline is drawn with ``fill_line`` on the vertex cells, so vertices must be
+        whole cell coordinates.
+
+        Args:
+            value: The value to fill.
+            points (list): The vertices (row, column) of the polygon, in order, as integers.
+
+        Raises:
+            ValueError: If a vertex coordinate is not a whole number.
+        """
+        if not points:
+            return
+        if any(coordinate != int(coordinate) for point in points for coordinate in point):
+            raise ValueError("Polygon vertices must be whole cell coordinates")
+        edges = [(points[i], points[(i + 1) % len(points)]) for i in range(len(points))]
+        top = max(int(-(-min(point[0] for point in points) // 1)), 0)
+        bottom = min(int(max(point[0] for point in points) // 1), self.rows - 1)
+        for row in range(top, bottom + 1):
+            crossings = sorted(
+                col0 + (row - row0) * (col1 - col0) / (row1 - row0)
+                for (row0, col0), (row1, col1) in edges
+                if row0 != row1 and min(row0, row1) <= row < max(row0, row1))
+            for left, right in zip(crossings[::2], crossings[1::2]):
+                self._fill_span_clipped(value, row, int(-(-left // 1)), int(right // 1) + 1)
+        for first, second in edges:
+            self.fill_line(value, first, second)
+
+    def transpose(self):
+        """
+        Transpose the matrix by swapping rows and columns.
+
+        This moves every cell; use ``transpose_view()`` for an O(1) transposed view. On a
+        matrix opened with ``open(path, 'r+')`` the shape in the file header is updated too.
+        """
+        n = self.rows
+        if n == self.columns and n in SMALL_SIZES and self.storage.kind == 'dense':
+            data = self.storage.data
+            data[:] = self.storage._pack([data[i] for i in _TRANSPOSE[n]])
+        else:
+            self.storage.transpose()
+            self.rows, self.columns = self.columns, self.rows
+            if getattr(self, '_mmap', None) is not None:
+                # The cells moved in place in the mapping; keep the file's shape in step.
+                FILE_HEADER.pack_into(self._mmap, 0, FILE_MAGIC, FILE_VERSION, self.storage.typecode.encode(),
+                                      sys.byteorder[0].encode(), self.rows, self.columns)
+        self._changed()
+
+    def determinant(self):
+        """
+        Calculate the determinant of the matrix from its LU factorization.
+
+        2x2, 3x3 and 4x4 matrices use the closed-form cofactor expansion instead. Larger
+        matrices whose cells are all ints or ``Fraction``s use fraction-free Bareiss
+        elimination. Both are exact.
+
+        Returns:
+            float: The determinant of the matrix, an int or ``Fraction`` when it is exact.
+
+        Raises:
+            ValueError: If the matrix is not square.
+        """
+        if self.rows != self.columns:
+            raise ValueError("Determinant is only defined for square matrices")
+        if self.rows in SMALL_SIZES:
+            return DETERMINANT_KERNELS[self.rows](*self.storage.values())
+        exact = self._exact_rows()
+        if exact is not None:
+            rows, scale = exact
+            echelon, sign, rank = self._bareiss(rows)
+            if rank < self.rows:
+                return 0
+            det = sign * echelon[-1][-1]
+            return det if scale == 1 else Fraction(det, scale ** self.rows)
+        lu, _, sign, singular = self._lu_factor()
+        if singular:
+            return 0
+        det = sign
+        for i in range(self.rows):
+            det *= lu[i][i]
+        return det
+
+    def _lu_factor(self):
+        """
+        Compute, or return the cached, LU factorization of the matrix with partial pivoting.
+
+        The factorization is ``P·A = L·U`` with L unit lower triangular. Both factors are
+        packed into one 2D list, L below the diagonal and U on and above it. It is cached
+        until the matrix is written to again.
+
+        Returns:
+            tuple: The packed factors, the row permutation (list), the permutation sign
+                and whether the matrix is singular.
+        """
+        if self._lu is not None:
+            return self._lu
+        n = self.rows
+        lu = [[float(value) for value in row] for row in self._to_2d_list()]
+        perm = list(range(n))
+        sign = 1
+        singular = False
+        for k in range(n):
+            pivot = max(range(k, n), key=lambda i: abs(lu[i][k]))
+            if lu[pivot][k] == 0:
+                singular = True
+                continue
+            if pivot != k:
+                lu[k], lu[pivot] = lu[pivot], lu[k]
+                perm[k], perm[pivot] = perm[pivot], perm[k]
+                sign = -sign
+            row_k = lu[k]
+            pivot_value = row_k[k]
+            tail = row_k[k + 1:]
+            for i in range(k + 1, n):
+                row_i = lu[i]
+                factor = row_i[k] / pivot_value
+                row_i[k] = factor
+                if factor:
+                    row_i[k + 1:] = [a - factor * b for a, b in zip(row_i[k + 1:], tail)]
+        self._lu = (lu, perm, sign, singular)
+        return self._lu
+
+    @staticmethod
+    def _lu_substitute(lu, perm, b):
+        """
+        Solve ``A·x = b`` for one right-hand side using packed LU factors.
+
+        Args:
+            lu (list): The packed LU factors.
+            perm (list): The row permutation of the factorization.
+            b (list): The right-hand side vector.
+
+        Returns:
+            list: The solution vector.
+        """
+        n = len(lu)
+        y = [b[p] for p in perm]
+        for i in range(1, n):
+            row = lu[i]
+            y[i] -= sum(row[j] * y[j] for j in range(i))
+        for i in range(n - 1, -1, -1):
+            row = lu[i]
+            y[i] = (y[i] - sum(row[j] * y[j] for j in range(i + 1, n))) / row[i]
+        return y
+
+    def _to_2d_list(self):
+        """
+        Convert the matrix data to a 2D list.
+
+        Returns:
+            list: The matrix as a 2D list.
+        """
+        return self.storage.to_rows()
+
+    def inverse(self):
+        """
+        Calculate the inverse of the matrix from its LU factorization.
+
+        Matrices whose cells are all ints or ``Fraction``s are inverted exactly with
+        fraction-free Bareiss elimination instead, and 2x2, 3x3 and 4x4 matrices of other
+        numbers from their closed-form adjugate.
+
+        Returns:
+            list: The inverse matrix as a 2D list, of ``Fraction``s when it is exact.
+
+        Raises:
+            ValueError: If the matrix is not square or is singular.
+        """
+        if self.rows != self.columns:
+            raise ValueError("Inverse is only defined for square matrices")
+        n = self.rows
+        exact = self._exact_rows()
+        if exact is not None:
+            return self._exact_inverse(*exact)
+        if n in SMALL_SIZES:
+            *adjugate, det = ADJUGATE_KERNELS[n](*self.storage.values())
+            if det == 0:
+                raise ValueError("Matrix is singular and cannot be inverted")
+            scale = 1.0 / det
+            return [[value * scale for value in adjugate[row:row + n]] for row in range(0, n * n, n)]
+        lu, perm, _, singular = self._lu_factor()
+        if singular:
+            raise ValueError("Matrix is singular and cannot be inverted")
+        columns = [self._lu_substitute(lu, perm, [1.0 if i == j else 0.0 for i in range(n)]) for j in range(n)]
+        return [list(row) for row in zip(*columns)]
+
+    def _exact_rows(self):
+        """
+        Get the cells as integer rows if they are all ints or ``Fraction``s.
+
+        ``Fraction`` cells are scaled by the least common multiple of their denominators.
+
+        Returns:
+            tuple: The rows (2D list of ints) and the scale, or None if any cell is not rational.
+        """
+        values = list(self.storage.values())
+        if not values or not all(isinstance(value, Rational) for value in values):
+            return None
+        scale = lcm(*(value.denominator for value in values))
+        columns = self.columns
+        if scale != 1:
+            values = [int(value * scale) for value in values]
+        return [list(values[row:row + columns]) for row in range(0, len(values), columns)], scale
+
+    @staticmethod
+    def _bareiss(rows):
+        """
+        Reduce integer rows to echelon form in place with fraction-free Bareiss elimination.
+
+        Every division is exact and every intermediate cell is a minor of the input, so
+        the cells stay integers of bounded size. Columns without a pivot are skipped.
+
+        Args:
+            rows (list): 2D list of ints, modified in place.
+
+        Returns:
+            tuple: The rows, the sign of the row permutation and the rank. For a full rank
+                square input the last pivot is the determinant of the row-permuted matrix.
+        """
+        height = len(rows)
+        width = len(rows[0]) if rows else 0
+        sign, previous, rank = 1, 1, 0
+        for col in range(width):
+            if rank == height:
+                break
+            pivot = next((i for i in range(rank, height) if rows[i][col]), None)
+            if pivot is None:
+                continue
+            if pivot != rank:
+                rows[rank], rows[pivot] = rows[pivot], rows[rank]
+                sign = -sign
+            pivot_row = rows[rank]
+            p = pivot_row[col]
+            for i in range(rank + 1, height):
+                row = rows[i]
+                factor = row[col]
+                row[col] = 0
+                row[col + 1:] = [(p * a - factor * b) // previous
+                                 for a, b in zip(row[col + 1:], pivot_row[col + 1:])]
+            previous = p
+            rank += 1
+        return rows, sign, rank
+
+    def _exact_inverse(self, rows, scale):
+        """
+        Invert integer rows exactly: Bareiss on ``[A | I]``, then integer back substitution
+        of ``D·A⁻¹`` where D is the last pivot, so every division is exact.
+
+        Args:
+            rows (list): The integer rows of the (scaled) matrix.
+            scale (int): Factor the matrix cells were multiplied by.
+
+        Returns:
+            list: The inverse as a 2D list of ``Fraction``s.
+
+        Raises:
+            ValueError: If the matrix is singular.
+        """
+        n = len(rows)
+        augmented = [row + [1 if i == j else 0 for j in range(n)] for i, row in enumerate(rows)]
+        echelon = self._bareiss(augmented)[0]
+        # A singular A leaves the last row without a pivot in its left half.
+        if not echelon[n - 1][n - 1]:
+            raise ValueError("Matrix is singular and cannot be inverted")
+        d = echelon[n - 1][n - 1]
+        scaled = [None] * n
+        for i in range(n - 1, -1, -1):
+            row = echelon[i]
+            scaled[i] = [(d * b - sum(row[k] * scaled[k][j] for k in range(i + 1, n))) // row[i]
+                         for j, b in enumerate(row[n:])]
+        return [[Fraction(value * scale, d) for value in row] for row in scaled]
+
+    def rank(self, tolerance: float = None) -> int:
+        """
+        Calculate the rank of the matrix.
+
+        Matrices whose cells are all ints or ``Fraction``s use exact fraction-free Bareiss
+        elimination. Others use Gaussian elimination with partial pivoting, treating pivots
+        no larger than ``tolerance`` as zero.
+
+        Args:
+            tolerance (float): Pivot threshold for inexact cells. Defaults to
+                ``max(rows, columns) * 2.2e-16 * largest absolute cell``.
+
+        Returns:
+            int: The rank.
+        """
+        exact = self._exact_rows()
+        if exact is not None:
+            return self._bareiss(exact[0])[2]
+        rows = [[float(value) for value in row] for row in self._to_2d_list()]
+        if tolerance is None:
+            largest = max((abs(value) for row in rows for value in row), default=0.0)
+            tolerance = max(self.rows, self.columns) * 2.2e-16 * largest
+        rank = 0
+        for col in range(self.columns):
+            if rank == self.rows:
+                break
+            pivot = max(range(rank, self.rows), key=lambda i: abs(rows[i][col]))
+            if abs(rows[pivot][col]) <= tolerance:
+                continue
+            rows[rank], rows[pivot] = rows[pivot], rows[rank]
+            pivot_row = rows[rank]
+            for i in range(rank + 1, self.rows):
+                row = rows[i]
+                factor = row[col] / pivot_row[col]
+                if factor:
+                    row[col:] = [a - factor * b for a, b in zip(row[col:], pivot_row[col:])]
+            rank += 1
+        return rank
+
+    def solve(self, b):
+        """
+        Solve the linear system ``self · x = b`` using the cached LU factorization.
+
+        Args:
+            b (list or Matrix): The right-hand side, either a vector or a matrix with one
+                right-hand side per column.
+
+        Returns:
+            list or Matrix: The solution, of the same kind as ``b``.
+
+        Raises:
+            ValueError: If the matrix is not square, is singular, or ``b`` has the wrong size.
+        """
+        if self.rows != self.columns:
+            raise ValueError("Solve is only defined for square matrices")
+        rhs_rows = b.rows if isinstance(b, Matrix) else len(b)
+        if rhs_rows != self.rows:
+            raise ValueError("Right-hand side must have as many rows as the matrix")
+        lu, perm, _, singular = self._lu_factor()
+        if singular:
+            raise ValueError("Matrix is singular, the system has no unique solution")
+        if not isinstance(b, Matrix):
+            return self._lu_substitute(lu, perm, list(b))
+        result = b._like(b.rows, b.columns)
+        columns = [self._lu_substitute(lu, perm, b.storage.column(col)) for col in range(b.columns)]
+        result.storage.assign(value for row in zip(*columns) for value in row)
+        return result
+
+    def add(self, other, out=None):
+        """
+        Add another matrix to this matrix element-wise.
+
+        Without ``out`` the sum is written into this matrix; with ``out`` this matrix is
+        left untouched and the sum is written into ``out``'s existing storage.
+
+        Args:
+            other (Matrix): The matrix to add.
+            out (Matrix): Optional matrix of the same dimensions receiving the result.
+
+        Returns:
+            Matrix: The matrix holding the result.
+
+        Raises:
+            ValueError: If the matrices have different dimensions.
+        """
+        if self.rows != other.rows or self.columns != other.columns:
+            raise ValueError("Matrices must have the same dimensions to be added")
+        return self._elementwise(other, self if out is None else out, add)
+
+    def subtract(self, other, out=None):
+        """
+        Subtract another matrix from this matrix element-wise.
+
+        Without ``out`` the difference is written into this matrix; with ``out`` it is
+        written into ``out``'s existing storage.
+
+        Args:
+            other (Matrix): The matrix to subtract.
+            out (Matrix): Optional matrix of the same dimensions receiving the result.
+
+        Returns:
+            Matrix: The matrix holding the result.
+
+        Raises:
+            ValueError: If the matrices have different dimensions.
+        """
+        if self.rows != other.rows or self.columns != other.columns:
+            raise ValueError("Matrices must have the same dimensions to be subtracted")
+        return self._elementwise(other, self if out is None else out, sub)
+
+    def _check_out(self, out, rows: int, columns: int) -> None:
+        """
+        Raise a ValueError if an output matrix does not have the given dimensions.
+        """
+        if out is not None and (out.rows != rows or out.columns != columns):
+            raise ValueError(f"Output matrix must be {rows}x{columns}, got {out.rows}x{out.columns}")
+
+    @staticmethod
+    def _numpy_operands(*matrices):
+        """
+        Get NumPy arrays sharing memory with each matrix, if NumPy is available and every
+        matrix is (a view of) a dense matrix with a typecode.
+
+        Returns:
+            list: The arrays, or None.
+        """
+        if numpy is None:
+            return None
+        for matrix in matrices:
+            storage = matrix.storage
+            if storage.kind == 'view':
+                storage = storage.parent.storage
+            if storage.kind != 'dense' or storage.typecode is None:
+                return None
+        return [matrix.to_numpy() for matrix in matrices]
+
+    def _elementwise(self, other, out, op):
+        """
+        Apply ``operator.add``, ``sub`` or ``mul`` cell by cell to this matrix and another one.
+
+        Typed dense operands run as one NumPy ufunc writing into ``out``'s buffer, sparse
+        operands only visit their non-zero cells, anything else is one pass over the cells.
+
+        Args:
+            other (Matrix): The right operand, of the same dimensions.
+            out (Matrix): Matrix receiving the result, a new one if None. May be an operand.
+            op (callable): The operator.
+
+        Returns:
+            Matrix: The matrix holding the result.
+        """
+        if out is None:
+            out = self._like(self.rows, self.columns)
+        self._check_out(out, self.rows, self.columns)
+        arrays = self._numpy_operands(self, other, out)
+        if arrays is not None:
+            NUMPY_UFUNCS[op](*arrays[:2], out=arrays[2])
+        elif 'sparse' in (self.storage.kind, other.storage.kind):
+            left, right = self._row_maps(), other._row_maps()
+            if op is mul:
+                cells = {row: {col: value * right[row][col] for col, value in row_cells.items() if col in right[row]}
+                         for row, row_cells in left.items() if row in right}
+            else:
+                cells = {row: dict(row_cells) for row, row_cells in left.items()}
+                for row, row_cells in right.items():
+                    target = cells.setdefault(row, {})
+                    for col, value in row_cells.items():
+                        target[col] = op(target.get(col, 0), value)
+            out._assign_row_maps(cells)
+        else:
+            out.storage.assign(list(map(op, self.storage.values(), other.storage.values())))
+        out._changed()
+        return out
+
+    def _scale(self, factor, out):
+        """
+        Multiply every cell by a scalar into ``out`` (which may be this matrix).
+
+        Returns:
+            Matrix: The matrix holding the result.
+        """
+        self._check_out(out, self.rows, self.columns)
+        arrays = self._numpy_operands(self, out)
+        if arrays is not None:
+            numpy.multiply(arrays[0], factor, out=arrays[1])
+        elif 'sparse' in (self.storage.kind, out.storage.kind):
+            out._assign_row_maps({row: {col: value * factor for col, value in cells.items()}
+                                  for row, cells in self._row_maps().items()})
+        else:
+            out.storage.assign([value * factor for value in self.storage.values()])
+        out._changed()
+        return out
+
+    def __add__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.add(other, self._like(self.rows, self.columns))
+
+    def __iadd__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.add(other)
+
+    def __sub__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.subtract(other, self._like(self.rows, self.columns))
+
+    def __isub__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.subtract(other)
+
+    def __mul__(self, other):
+        """
+        ``matrix * scalar`` scales, ``matrix * matrix`` is the Hadamard (element-wise) product.
+        """
+        if isinstance(other, Matrix):
+            return self.hadamard_product(other)
+        return self.multiply(other, out=self._like(self.rows, self.columns))
+
+    def __rmul__(self, other):
+        return self.multiply(other, out=self._like(self.rows, self.columns))
+
+    def __imul__(self, other):
+        if isinstance(other, Matrix):
+            return self.hadamard_product(other, out=self)
+        return self.multiply(other)
+
+    def __matmul__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.multiply(other)
+
+    def __imatmul__(self, other):
+        """
+        ``matrix @= other`` writes the product back into this matrix's storage, so ``other``
+        must be square.
+        """
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.multiply(other, out=self)
+
+    def __neg__(self):
+        return self.multiply(-1, out=self._like(self.rows, self.columns))
+
+    def lazy(self):
+        """
+        Start a lazy expression on this matrix.
+
+        Arithmetic on the returned matrix (named methods and operators) builds an
+        expression tree instead of computing (or mutating) anything. The tree is run as one
+        fused row-by-row pass on ``evaluate()`` or on the first read of a cell.
+
+        Returns:
+            LazyMatrix: A lazy matrix wrapping this one.
+        """
+        return LazyMatrix('leaf', (self,), self.rows, self.columns, self)
+
+    def items(self):
+        """
+        Iterate over the non-empty cells of the matrix in row-major order.
+
+        Sparse matrices only visit their stored cells.
+
+        Yields:
+            tuple: ``((row, column), value)`` for every cell that is not the empty index.
+        """
+        if self.storage.kind == 'sparse':
+            yield from self.storage.items()
+            return
+        empty, columns = self.empty_index, self.columns
+        for i, value in enumerate(self.storage.values()):
+            if value != empty:
+                yield divmod(i, columns), value
+
+    def _row_maps(self) -> dict:
+        """
+        Get the non-zero cells grouped by row, as used by the sparse kernels.
+
+        Returns:
+            dict: ``{row: {column: value}}`` for every cell that is neither zero nor empty.
+        """
+        if self.storage.kind == 'sparse':
+            return self.storage.data
+        rows, columns = {}, self.columns
+        for i, value in enumerate(self.storage.values()):
+            if value:
+                rows.setdefault(i // columns, {})[i % columns] = value
+        return rows
+
+    def _assign_row_maps(self, cells: dict) -> None:
+        """
+        Replace every cell from a ``{row: {column: value}}`` mapping. Cells missing from
+        the mapping are left empty on sparse matrices and set to zero otherwise.
+        """
+        if self.storage.kind != 'sparse':
+            columns = self.columns
+            flat = [0] * (self.rows * columns)
+            for row, row_cells in cells.items():
+                for col, value in row_cells.items():
+                    flat[row * columns + col] = value
+            self.storage.assign(flat)
+            return
+        self.storage.data = {}
+        for row, row_cells in cells.items():
+            for col, value in row_cells.items():
+                self.storage.set(row, col, value)
+
+    def to_dense(self, typecode: str = None):
+        """
+        Convert the matrix to a new dense matrix.
+
+        Args:
+            typecode (str): Optional ``array`` typecode of the dense buffer.
+
+        Returns:
+            Matrix: The dense copy.
+        """
+        result = Matrix(self.rows, self.columns, 'dense', typecode,
+                        None if typecode is not None else self.empty_index)
+        for (row, col), value in self.items():
+            result.storage.set(row, col, value)
+        return result
+
+    def to_sparse(self):
+        """
+        Convert the matrix to a new sparse matrix keeping only its non-empty cells.
+
+        Returns:
+            Matrix: The sparse copy.
+        """
+        result = Matrix(self.rows, self.columns, 'sparse', empty_index=self.empty_index)
+        for (row, col), value in self.items():
+            result.storage.set(row, col, value)
+        return result
+
+    def _as_numpy(self, lossless: bool = False):
+        """
+        Get the cells as a 2D NumPy array, or None if they are not all numeric.
+
+        Args:
+            lossless (bool): Only accept cells NumPy computes with the same semantics:
+                typed buffers, Python floats or complex numbers. Python ints would become
+                fixed-width int64 that overflows silently, so they are refused.
+
+        Returns:
+            numpy.ndarray: The cells, sharing memory with an array backed dense storage.
+        """
+        values = self.to_numpy()
+        if lossless and values.dtype.kind not in 'fc' and self._numpy_operands(self) is None:
+            return None
+        return values if values.dtype.kind in 'biufc' else None
+
+    def multiply(self, other, backend: str = 'auto', out=None):
+        """
+        Multiply this matrix by another matrix or a scalar.
+
+        Matrix products run on ``numpy.matmul`` when NumPy is importable, the product
+        has at least ``NUMPY_THRESHOLD`` multiply-adds and the cells are floats, complex
+        numbers or a typed buffer; Python ints and Fractions stay on the exact Python
+        kernels unless ``backend='numpy'`` is forced. Without NumPy, float products with
+        at least ``PARALLEL_THRESHOLD`` multiply-adds are split into row blocks across
+        ``PARALLEL_WORKERS`` processes sharing the operands through shared memory; other
+        cells only go there when ``backend='parallel'`` is forced, and are then computed
+        as floats (rounded back for integer typecodes). Anything else runs on a
+        cache-blocked pure Python kernel, or on an unrolled one for products of two 2x2,
+        3x3 or 4x4 matrices.
+
+        A matrix product is returned as a new matrix, or written into ``out``'s existing
+        storage; when ``out`` is neither operand the kernels write straight into it. A
+        scalar product is written into this matrix, or into ``out``.
+
+        Args:
+            other (Matrix or scalar): The matrix or scalar to multiply by.
+            backend (str): 'auto' to choose as above, or 'python' / 'numpy' / 'parallel' to force a backend.
+            out (Matrix): Optional matrix receiving the result.
+
+        Returns:
+            Matrix: The matrix holding the result.
+
+        Raises:
+            ValueError: If the matrices cannot be multiplied, ``out`` has the wrong
+                dimensions or the backend is unknown.
+            ImportError: If the 'numpy' backend is forced and NumPy is not installed.
+        """
+        if not isinstance(other, Matrix):
+            return self._scale(other, self if out is None else out)
+        if self.columns != other.rows:
+            raise ValueError("Matrices cannot be multiplied")
+        self._check_out(out, self.rows, other.columns)
+        chosen = _choose_backend(backend, self.rows * self.columns * other.columns)
+        if 'sparse' in (self.storage.kind, other.storage.kind):
+            result = self._like(self.rows, other.columns) if out is None else out
+            result._assign_row_maps(self._multiply_sparse(other))
+            result._changed()
+            return result
+        aliased = out is self or out is other
+        result = self._like(self.rows, other.columns) if out is None or aliased else out
+        if chosen == 'numpy':
+            lossless = backend != 'numpy'
+            a, b = self._as_numpy(lossless), other._as_numpy(lossless)
+            if a is not None and b is not None:
+                targets = self._numpy_operands(result)
+                if targets is not None:
+                    numpy.matmul(a, b, out=targets[0])
+                else:
+                    result.storage.assign(numpy.matmul(a, b).ravel().tolist())
+                return self._multiply_done(result, out)
+            if backend == 'numpy':
+                raise ValueError("The 'numpy' multiply backend requires numeric cells")
+        if chosen == 'parallel' and (backend == 'parallel' or
+                                     _float_cells(self.storage) and _float_cells(other.storage)):
+            try:
+                a, b = array('d', self.storage.values()), array('d', other.storage.values())
+            except TypeError:
+                raise ValueError("The 'parallel' multiply backend requires numeric cells") from None
+            product = _parallel_multiply(a, b, self.rows, self.columns, other.columns, PARALLEL_WORKERS)
+            if result.storage.typecode not in (None, 'f', 'd'):
+                product = map(round, product)
+            result.storage.assign(product)
+            return self._multiply_done(result, out)
+        n = self.rows
+        if n == self.columns == other.columns and n in SMALL_SIZES:
+            result.storage.assign(_MULTIPLY[n](self.storage.values(), other.storage.values()))
+            return self._multiply_done(result, out)
+        if result.storage.kind == 'dense' and result.storage.typecode is None:
+            product = result.storage.data
+        else:
+            product = [0] * (self.rows * other.columns)
+        _multiply_flat(list(self.storage.values()), list(other.storage.values()), product,
+                       self.rows, self.columns, other.columns)
+        if product is not result.storage.data:
+            result.storage.assign(product)
+        return self._multiply_done(result, out)
+
+    @staticmethod
+    def _multiply_done(result, out):
+        """
+        Finish a matrix product: copy it into ``out`` if it had to be computed aside
+        because ``out`` was an operand, and drop cached state of the written matrix.
+        """
+        if out is not None and result is not out:
+            out.storage.assign(result.storage.values())
+            result = out
+        result._changed()
+        return result
+
+    def _multiply_sparse(self, other) -> dict:
+        """
+        Multiply by another matrix when either side is sparse, only visiting non-zero cells.
+
+        Args:
+            other (Matrix): The right operand.
+
+        Returns:
+            dict: The non-zero cells of the product as ``{row: {column: value}}``.
+        """
+        right = other._row_maps()
+        product = {}
+        for row, cells in self._row_maps().items():
+            acc = {}
+            for k, a in cells.items():
+                for col, b in right.get(k, {}).items():
+                    acc[col] = acc.get(col, 0) + a * b
+            acc = {col: value for col, value in acc.items() if value}
+            if acc:
+                product[row] = acc
+        return product
+
+    def trace(self):
+        """
+        Calculate the trace of the matrix (sum of the diagonal elements).
+
+        Returns:
+            float: The trace of the matrix.
+
+        Raises:
+            ValueError: If the matrix is not square.
+        """
+        if self.rows != self.columns:
+            raise ValueError("Trace is only defined for square matrices")
+        n = self.rows
+        if self.storage.kind == 'dense':
+            return sum(self.storage.data[::n + 1])
+        return sum(self.storage.get(i, i) for i in range(n))
+
+    def submatrix(self, start_row, start_col, end_row, end_col):
+        """
+        Extract a submatrix from the matrix.
+
+        Args:
+            start_row (int): The starting row index.
+            start_col (int): The starting column index.
+            end_row (int): The ending row index.
+            end_col (int): The ending column index.
+
+        Returns:
+            Matrix: The extracted submatrix, as an owned copy.
+        """
+        return self.view(start_row, start_col, end_row, end_col).copy()
+
+    def copy(self):
+        """
+        Create an owned copy of the matrix with the same storage backend.
+
+        Returns:
+            Matrix: The copy.
+        """
+        result = self._like(0, 0)
+        result.rows, result.columns = self.rows, self.columns
+        result.storage = self.storage.copy()
+        return result
+
+    def snapshot(self):
+        """
+        Capture the current cells for undo or rollback.
+
+        On chunked storage (``storage='chunked'``) the snapshot shares every chunk with
+        this matrix and costs O(chunks); later writes copy only the chunks they touch, so
+        many snapshots of a slowly changing matrix stay cheap. Other backends copy the
+        whole storage.
+
+        Returns:
+            MatrixSnapshot: The immutable snapshot.
+        """
+        return MatrixSnapshot(self)
+
+    def restore(self, snapshot) -> None:
+        """
+        Set every cell back to the values of a snapshot.
+
+        On chunked storage only the chunks written since the snapshot are swapped back in,
+        by reference, and only their rows are reported as changed.
+
+        Args:
+            snapshot (MatrixSnapshot): A snapshot of a matrix with the same dimensions.
+
+        Raises:
+            ValueError: If the snapshot has different dimensions.
+        """
+        if (snapshot.rows, snapshot.columns) != (self.rows, self.columns):
+            raise ValueError(f"Cannot restore a {snapshot.rows}x{snapshot.columns} snapshot into a "
+                             f"{self.rows}x{self.columns} matrix")
+        storage = self.storage
+        if storage.kind != 'chunked' or snapshot._storage.kind != 'chunked':
+            storage.assign(snapshot._storage.values())
+            self._changed()
+            return
+        changed = storage.restore(snapshot._storage)
+        if not changed:
+            return
+        # One rectangle per run of adjacent restored chunks, so untouched bands in between are not reported.
+        band, regions = storage.chunk_rows, []
+        for chunk in changed:
+            start, end = chunk * band, min(self.rows, (chunk + 1) * band) - 1
+            if regions and regions[-1][2] == start - 1:
+                regions[-1] = (regions[-1][0], 0, end, self.columns - 1)
+            else:
+                regions.append((start, 0, end, self.columns - 1))
+        self._changed(regions[0])
+        if self._changes is not None:
+            for region in regions[1:]:
+                self._changes.add_rect(region)
+
+    def view(self, start_row: int = 0, start_col: int = 0, end_row: int = None, end_col: int = None):
+        """
+        Get a view of a rectangular window of the matrix without copying it.
+
+        Reads and writes go through to this matrix. The view stays valid as long as this
+        matrix keeps its shape; call ``copy()`` on it to get an owned matrix.
+
+        Args:
+            start_row (int): The starting row index.
+            start_col (int): The starting column index.
+            end_row (int): The ending row index (inclusive), defaults to the last row.
+            end_col (int): The ending column index (inclusive), defaults to the last column.
+
+        Returns:
+            MatrixView: The view.
+        """
+        end_row = self.rows - 1 if end_row is None else end_row
+        end_col = self.columns - 1 if end_col is None else end_col
+        self._check_index(start_row, start_col)
+        self._check_index(end_row, end_col)
+        return MatrixView(self, end_row - start_row + 1, end_col - start_col + 1, (start_row, start_col),
+                          ((1, 0), (0, 1)))
+
+    def row_view(self, row: int):
+        """
+        Get a 1 x columns view of a row without copying it.
+
+        Args:
+            row (int): The row index.
+
+        Returns:
+            MatrixView: The view.
+        """
+        return self.view(row, 0, row, self.columns - 1)
+
+    def column_view(self, column: int):
+        """
+        Get a rows x 1 view of a column without copying it.
+
+        Args:
+            column (int): The column index.
+
+        Returns:
+            MatrixView: The view.
+        """
+        return self.view(0, column, self.rows - 1, column)
+
+    def transpose_view(self):
+        """
+        Get a transposed view of the matrix without moving any cell.
+
+        Returns:
+            MatrixView: The view.
+        """
+        return MatrixView(self, self.columns, self.rows, (0, 0), ((0, 1), (1, 0)))
+
+    def swap_rows(self, row1, row2):
+        """
+        Swap two rows in the matrix.
+
+        Args:
+            row1 (int): The first row index.
+            row2 (int): The second row index.
+
+        Raises:
+            IndexError: If either index is out of range.
+        """
+        self._check_row(row1)
+        self._check_row(row2)
+        if self._value_index is not None or self._regions is not None:
+            first, second = self.storage.row(row1), self.storage.row(row2)
+            for col in range(self.columns):
+                if self._value_index is not None:
+                    self._index_move(first[col], second[col], (row1, col))
+                    self._index_move(second[col], first[col], (row2, col))
+                if self._regions is not None:
+                    self._regions.move(row1, col, first[col], second[col])
+                    self._regions.move(row2, col, second[col], first[col])
+        self.storage.swap_rows(row1, row2)
+        self._lu = None
+        self._sat = None
+        if self._changes is not None:
+            self._changes.add_span(row1, 0, self.columns)
+            self._changes.add_span(row2, 0, self.columns)
+
+    def swap_columns(self, col1, col2):
+        """
+        Swap two columns in the matrix.
+
+        Args:
+            col1 (int): The first column index.
+            col2 (int): The second column index.
+
+        Raises:
+            IndexError: If either index is out of range.
+        """
+        self._check_column(col1)
+        self._check_column(col2)
+        storage = self.storage
+        for row in range(self.rows):
+            a, b = storage.get(row, col1), storage.get(row, col2)
+            self._write(row, col1, b)
+            self._write(row, col2, a)
+
+    def fill_diagonal(self, value):
+        """
+        Fill the diagonal of the matrix with the specified value.
+
+        Args:
+            value: The value to fill.
+        """
+        for i in range(min(self.rows, self.columns)):
+            self._write(i, i, value)
+
+    def power(self, n):
+        """
+        Raise the matrix to the given power.
+
+        Uses exponentiation by squaring, so only O(log n) multiplications are done, all
+        into the same three scratch buffers. Diagonal matrices are raised cell by cell,
+        and negative powers raise the inverse, which reuses the cached LU factors.
+
+        Args:
+            n (int): The power to raise the matrix to.
+
+        Returns:
+            Matrix: The result of raising the matrix to the power.
+
+        Raises:
+            ValueError: If the matrix is not square, or is singular and n is negative.
+        """
+        if self.rows != self.columns:
+            raise ValueError("Power is only defined for square matrices")
+        size = self.rows
+        result = self._like(size, size)
+        if n == 1:
+            result.storage.assign(self.storage.values())
+            return result
+        base = list(self.storage.values())
+        if all(not value for i, value in enumerate(base) if i % (size + 1)):
+            diagonal = base[::size + 1]
+            if n < 0 and not all(diagonal):
+                raise ValueError("Matrix is singular and cannot be raised to a negative power")
+            base = [0] * (size * size)
+            base[::size + 1] = [value ** n for value in diagonal]
+            result.storage.assign(base)
+            return result
+        if n == 0:
+            base = [0] * (size * size)
+            base[::size + 1] = [1] * size
+            result.storage.assign(base)
+            return result
+        if n < 0:
+            base = [value for row in self.inverse() for value in row]
+            n = -n
+        acc = None
+        scratch = [0] * (size * size)
+        while True:
+            if n & 1:
+                if acc is None:
+                    acc = base[:]
+                else:
+                    _multiply_flat(acc, base, scratch, size, size, size)
+                    acc, scratch = scratch, acc
+            n >>= 1
+            if not n:
+                break
+            _multiply_flat(base, base, scratch, size, size, size)
+            base, scratch = scratch, base
+        result.storage.assign(acc)
+        return result
+
+    def hadamard_product(self, other, out=None):
+        """
+        Compute the element-wise product of this matrix and another matrix.
+
+        Args:
+            other (Matrix): The matrix to multiply element-wise.
+            out (Matrix): Optional matrix of the same dimensions receiving the result.
+
+        Returns:
+            Matrix: The result of the element-wise multiplication, ``out`` if given.
+
+        Raises:
+            ValueError: If the matrices have different dimensions.
+        """
+        if self.rows != other.rows or self.columns != other.columns:
+            raise ValueError("Matrices must have the same dimensions for Hadamard product")
+        return self._elementwise(other, out, mul)
+
+    def norm(self):
+        """
+        Calculate the Frobenius norm of the matrix.
+
+        Returns:
+            float: The Frobenius norm of the matrix.
+        """
+        return sum(value ** 2 for value in self.storage.values()) ** 0.5
+
+    def _cell_values(self):
+        """
+        Iterate once over every cell value in row-major order, empty cells reading as 0.
+        """
+        values, empty = self.storage.values(), self.empty_index
+        if empty == 0:
+            return values
+        return (0 if value == empty else value for value in values)
+
+    def _cell_rows(self):
+        """
+        Iterate once over the rows as lists, empty cells reading as 0.
+        """
+        values, columns = self._cell_values(), self.columns
+        for _ in range(self.rows):
+            yield list(islice(values, columns))
+
+    def _reduction_array(self, axis: int, allow_empty: bool = False):
+        """
+        Validate a reduction axis and get the cells as a NumPy array when the storage can
+        be read without a copy, otherwise None.
+        """
+        if axis not in (None, 0, 1):
+            raise ValueError(f"Axis must be None, 0 or 1, got {axis}")
+        if not allow_empty and not (self.rows and self.columns):
+            raise ValueError("Cannot reduce an empty matrix")
+        if self.empty_index != 0:
+            return None
+        arrays = self._numpy_operands(self)
+        return arrays[0] if arrays else None
+
+    def reduce(self, function, axis: int = None, initial=None):
+        """
+        Fold the cells with a two-argument function in a single pass over the storage.
+
+        Empty cells count as 0. With ``axis=None`` the whole matrix folds to one value,
+        ``axis=0`` folds down each column and ``axis=1`` folds along each row. Column
+        folds keep one running value per column and combine them a whole row at a time.
+
+        Args:
+            function (callable): ``function(accumulated, value)`` returning the new
+                accumulated value.
+            axis (int): None, 0 or 1.
+            initial: Starting value of every fold. None starts from the first value.
+
+        Returns:
+            The folded value, or a list with one value per column (axis 0) or row (axis 1).
+
+        Raises:
+            ValueError: If the axis is invalid, or the matrix is empty and no initial value is given.
+        """
+        self._reduction_array(axis, allow_empty=initial is not None)
+        if axis is None:
+            values = self._cell_values()
+            return reduce(function, values) if initial is None else reduce(function, values, initial)
+        rows = self._cell_rows()
+        if axis == 1:
+            if initial is None:
+                return [reduce(function, row) for row in rows]
+            return [reduce(function, row, initial) for row in rows]
+        totals = next(rows) if initial is None else [initial] * self.columns
+        for row in rows:
+            totals = list(map(function, totals, row))
+        return totals
+
+    def sum(self, axis: int = None):
+        """
+        Sum the cells in a single pass. Empty cells count as 0.
+
+        Args:
+            axis (int): None for the total, 0 for one sum per column, 1 for one per row.
+
+        Returns:
+            The total, or a list of sums.
+
+        Raises:
+            ValueError: If the axis is invalid.
+        """
+        cells = self._reduction_array(axis, allow_empty=True)
+        if cells is not None:
+            return cells.sum(axis=axis).tolist()
+        if axis is None:
+            return sum(self._cell_values())
+        if axis == 1:
+            return [sum(row) for row in self._cell_rows()]
+        return self.reduce(add, 0, 0)
+
+    def min(self, axis: int = None):
+        """
+        Get the smallest cell value in a single pass. Empty cells count as 0.
+
+        Args:
+            axis (int): None for the whole matrix, 0 for one minimum per column, 1 for one per row.
+
+        Returns:
+            The minimum, or a list of minima.
+
+        Raises:
+            ValueError: If the axis is invalid or the matrix is empty.
+        """
+        cells = self._reduction_array(axis)
+        if cells is not None:
+            return cells.min(axis=axis).tolist()
+        if axis is None:
+            return min(self._cell_values())
+        if axis == 1:
+            return [min(row) for row in self._cell_rows()]
+        return self.reduce(min, 0)
 
-    def middle(self):
+    def max(self, axis: int = None):
         """
-        Get the middle index of the matrix.
+        Get the largest cell value in a single pass. Empty cells count as 0.
+
+        Args:
+            axis (int): None for the whole matrix, 0 for one maximum per column, 1 for one per row.
 
         Returns:
-            tuple: The middle index (row, column).
+            The maximum, or a list of maxima.
+
+        Raises:
+            ValueError: If the axis is invalid or the matrix is empty.
         """
-        return (self.rows + 1) // 2, (self.columns + 1) // 2
+        cells = self._reduction_array(axis)
+        if cells is not None:
+            return cells.max(axis=axis).tolist()
+        if axis is None:
+            return max(self._cell_values())
+        if axis == 1:
+            return [max(row) for row in self._cell_rows()]
+        return self.reduce(max, 0)
 
-    def get_middle(self):
+    def mean(self, axis: int = None):
         """
-        Get the value of the middle element of the matrix.
+        Get the arithmetic mean of the cells in a single pass. Empty cells count as 0.
+
+        Args:
+            axis (int): None for the whole matrix, 0 for one mean per column, 1 for one per row.
 
         Returns:
-            int: The value of the middle element.
+            float: The mean, or a list of means.
+
+        Raises:
+            ValueError: If the axis is invalid or the matrix is empty.
         """
-        return self.data[f'r{self.middle()[0]}c{self.middle()[1]}']
+        cells = self._reduction_array(axis)
+        if cells is not None:
+            return cells.mean(axis=axis).tolist()
+        if axis is None:
+            return self.sum() / (self.rows * self.columns)
+        count = self.rows if axis == 0 else self.columns
+        return [total / count for total in self.sum(axis)]
 
-    def find(self, value) -> list:
+    def argmax(self, axis: int = None):
         """
-        Find the indices of the matrix elements that match the given value.
+        Locate the largest cell value in a single pass. Empty cells count as 0 and ties
+        resolve to the first cell in row-major order.
 
         Args:
-            value: The value to search for.
+            axis (int): None for the whole matrix, 0 for the row of the maximum of each
+                column, 1 for the column of the maximum of each row.
 
         Returns:
-            list: A list of keys representing the indices of matching elements.
-        """
-        return [key for key, val in self.data.items() if val == value]
+            tuple or list: The ``(row, column)`` of the maximum, or a list of indices.
 
-    def get(self, row: int = nan, column: int = nan):
-        """
-        Get the values of the matrix elements based on the given row and/or column.
+        Raises:
+            ValueError: If the axis is invalid or the matrix is empty.
+        """
+        cells = self._reduction_array(axis)
+        if cells is not None:
+            if axis is None:
+                return divmod(int(cells.argmax()), self.columns)
+            return cells.argmax(axis=axis).tolist()
+        if axis is None:
+            return divmod(max(enumerate(self._cell_values()), key=itemgetter(1))[0], self.columns)
+        rows = self._cell_rows()
+        if axis == 1:
+            return [max(range(self.columns), key=row.__getitem__) for row in rows]
+        best, where = next(rows), [0] * self.columns
+        for index, row in enumerate(rows, 1):
+            for col, value in enumerate(row):
+                if value > best[col]:
+                    best[col] = value
+                    where[col] = index
+        return where
+
+    def _summed_area(self) -> tuple:
+        """
+        Compute, or return the cached, summed-area tables of the cell values (empty cells
+        counting as 0) and of the non-empty cells. Cached until the matrix is written to.
+
+        Returns:
+            tuple: Two flat ``(rows + 1) x (columns + 1)`` lists; cell ``(r, c)`` holds the
+                total of the cells above row ``r`` and left of column ``c``.
+        """
+        if self._sat is not None:
+            return self._sat
+        columns, width, empty = self.columns, self.columns + 1, self.empty_index
+        sums, counts = [0] * width, [0] * width
+        values = self.storage.values()
+        for _ in range(self.rows):
+            row_sum = row_count = 0
+            above = len(sums) - width
+            sums.append(0)
+            counts.append(0)
+            for col in range(columns):
+                value = next(values)
+                if value != empty and value is not None:
+                    row_sum += value
+                    row_count += 1
+                sums.append(sums[above + col + 1] + row_sum)
+                counts.append(counts[above + col + 1] + row_count)
+        self._sat = (sums, counts)
+        return self._sat
+
+    def _region_total(self, start_row, start_col, end_row, end_col, counts: bool):
+        """
+        Total a rectangle with the Fenwick trees if enabled, else the summed-area table.
+        """
+        if end_row is None:
+            end_row = self.rows - 1
+        if end_col is None:
+            end_col = self.columns - 1
+        if start_row > end_row or start_col > end_col:
+            return 0
+        self._check_index(start_row, start_col)
+        self._check_index(end_row, end_col)
+        if self._regions is not None:
+            return self._regions.query(start_row, start_col, end_row, end_col, counts)
+        table = self._summed_area()[1 if counts else 0]
+        width = self.columns + 1
+        top, bottom = start_row * width, (end_row + 1) * width
+        return (table[bottom + end_col + 1] - table[top + end_col + 1]
+                - table[bottom + start_col] + table[top + start_col])
+
+    def region_sum(self, start_row: int = 0, start_col: int = 0, end_row: int = None, end_col: int = None):
+        """
+        Sum the cells of a rectangle, with empty cells counting as 0.
+
+        Costs O(log rows · log columns) with ``enable_region_index``, otherwise O(1) once
+        the summed-area table is built (O(rows · columns), on the first query after a write).
 
         Args:
-            row (int): The row index.
-            column (int): The column index.
+            start_row (int): The first row.
+            start_col (int): The first column.
+            end_row (int): The last row, inclusive. Defaults to the last row of the matrix.
+            end_col (int): The last column, inclusive. Defaults to the last column of the matrix.
 
         Returns:
-            list: A list of values of the matching elements.
+            The sum of the cells.
+
+        Raises:
+            IndexError: If a corner falls outside of the matrix.
         """
-        return [self.data[key] for key in self.find_index(row, column)].pop(0)
+        return self._region_total(start_row, start_col, end_row, end_col, False)
 
-    def __setitem__(self, key, value):
+    def region_count(self, start_row: int = 0, start_col: int = 0, end_row: int = None, end_col: int = None) -> int:
         """
-        Set the value of a matrix element at the given key.
+        Count the non-empty cells of a rectangle, at the same cost as ``region_sum``.
 
         Args:
-            key: The key representing the index of the element.
-            value: The value to set.
+            start_row (int): The first row.
+            start_col (int): The first column.
+            end_row (int): The last row, inclusive. Defaults to the last row of the matrix.
+            end_col (int): The last column, inclusive. Defaults to the last column of the matrix.
+
+        Returns:
+            int: The number of cells that are not the empty index.
+
+        Raises:
+            IndexError: If a corner falls outside of the matrix.
         """
-        self.data[key] = value
+        return self._region_total(start_row, start_col, end_row, end_col, True)
 
-    def insert(self, value, row: int = nan, column: int = nan) -> None:
+    def swap_buffers(self, other) -> None:
         """
-        Insert a value into the matrix at the specified row and/or column.
+        Exchange all cells with another matrix in O(1) by swapping their storages.
 
         Args:
-            value: The value to insert.
-            row (int): The row index.
-            column (int): The column index.
-        """
-        for key in self.find_index(row=row, column=column):
-            self[key] = value
+            other (Matrix): A matrix of the same dimensions, storage backend and typecode.
 
-    def row(self, row: int = nan) -> list:
-        """
-        Get the values of the elements in the specified row.
+        Raises:
+            ValueError: If the matrices do not match.
+            TypeError: If either matrix is a view or memory-mapped.
+        """
+        if (self.rows, self.columns) != (other.rows, other.columns):
+            raise ValueError("Only matrices with the same dimensions can swap buffers")
+        if (self.storage.kind, self.storage.typecode) != (other.storage.kind, other.storage.typecode):
+            raise ValueError("Only matrices with the same storage backend and typecode can swap buffers")
+        if not self._swappable() or not other._swappable():
+            raise TypeError("Views and memory-mapped matrices cannot swap buffers")
+        self.storage, other.storage = other.storage, self.storage
+        self._changed()
+        other._changed()
+
+    def _swappable(self) -> bool:
+        """
+        Whether the storage object can be handed to another matrix.
+        """
+        return self.storage.kind != 'view' and getattr(self, '_mmap', None) is None
+
+    def _padded_rows(self, pad_rows: int, pad_columns: int, edge: str, fill) -> list:
+        """
+        Get the rows extended by ``pad_rows`` rows and ``pad_columns`` columns on each
+        side according to an edge mode.
+        """
+        if edge not in EDGE_MODES:
+            raise ValueError(f"Unknown edge mode '{edge}', expected one of {', '.join(EDGE_MODES)}")
+        rows, columns = self.storage.to_rows(), self.columns
+        width = columns + 2 * pad_columns
+        sources = [_edge_index(col, columns, edge) for col in range(-pad_columns, columns + pad_columns)]
+        padded = []
+        for row in range(-pad_rows, self.rows + pad_rows):
+            source = _edge_index(row, self.rows, edge)
+            if source is None:
+                padded.append([fill] * width)
+            elif edge == 'constant':
+                padded.append([fill] * pad_columns + rows[source] + [fill] * pad_columns)
+            else:
+                cells = rows[source]
+                padded.append([cells[col] for col in sources])
+        return padded
+
+    def _run_stencil(self, compute, steps: int, out):
+        """
+        Apply ``compute(source, target)`` ``steps`` times, alternating between two buffers.
+
+        With ``out`` being this matrix the result is swapped in at the end instead of copied
+        when the storages allow it.
+        """
+        if steps < 1:
+            raise ValueError("A stencil must run at least one step")
+        self._check_out(out, self.rows, self.columns)
+        if steps == 1 and out is not None and out is not self:
+            compute(self, out)
+            out._changed()
+            return out
+        buffers = [self._like(self.rows, self.columns), None]
+        source = self
+        for step in range(steps):
+            target = buffers[step % 2]
+            if target is None:
+                target = buffers[1] = self._like(self.rows, self.columns)
+            compute(source, target)
+            source = target
+        source._changed()
+        if out is None:
+            return source
+        if out is self and self._swappable() and self.storage.kind == source.storage.kind:
+            self.swap_buffers(source)
+        else:
+            out.storage.assign(list(source.storage.values()))
+            out._changed()
+        return out
+
+    def convolve(self, kernel, edge: str = 'constant', fill=0, out=None, steps: int = 1):
+        """
+        Convolve the matrix with a kernel.
+
+        The kernel is centered on each cell (and flipped, as in a true convolution), cells
+        beyond the border are read according to ``edge``. With NumPy available and numeric
+        cells the kernel runs over a sliding window view of the padded grid; otherwise each
+        output row is accumulated from whole row slices, one kernel weight at a time.
 
         Args:
-            row (int): The row index.
+            kernel (list or Matrix): The weights, with an odd number of rows and columns.
+            edge (str): 'constant' (cells beyond the border hold ``fill``), 'nearest',
+                'reflect' or 'wrap'.
+            fill: Value of the cells beyond the border for the 'constant' edge mode.
+            out (Matrix): Optional matrix receiving the result; it may be this matrix, the
+                result then replaces its cells through a buffer swap.
+            steps (int): Number of times to apply the kernel, double-buffered.
 
         Returns:
-            list: A list of values in the specified row.
-        """
-        return self.get(row=row)
+            Matrix: The result, ``out`` if given.
 
-    def column(self, column: int = nan) -> list:
-        """
-        Get the values of the elements in the specified column.
+        Raises:
+            ValueError: If the kernel does not have odd dimensions, the edge mode is
+                unknown or ``out`` has the wrong dimensions.
+        """
+        weights = kernel._to_2d_list() if isinstance(kernel, Matrix) else [list(row) for row in kernel]
+        height, width = len(weights), len(weights[0]) if weights else 0
+        if not (height % 2 and width % 2):
+            raise ValueError("Kernels must have an odd number of rows and columns")
+        if edge not in EDGE_MODES:
+            raise ValueError(f"Unknown edge mode '{edge}', expected one of {', '.join(EDGE_MODES)}")
+        flipped = [row[::-1] for row in weights[::-1]]
+        pad_rows, pad_columns = height // 2, width // 2
+
+        def compute(source, target):
+            cells = source._as_numpy() if numpy is not None else None
+            if cells is not None:
+                options = {'constant_values': fill} if edge == 'constant' else {}
+                padded = numpy.pad(cells, ((pad_rows, pad_rows), (pad_columns, pad_columns)),
+                                   NUMPY_EDGE_MODES[edge], **options)
+                windows = numpy.lib.stride_tricks.sliding_window_view(padded, (height, width))
+                result = numpy.tensordot(windows, numpy.asarray(flipped), axes=((2, 3), (0, 1)))
+                targets = self._numpy_operands(target)
+                if targets is not None:
+                    targets[0][...] = result
+                else:
+                    target.storage.assign(result.ravel().tolist())
+                return
+            padded = source._padded_rows(pad_rows, pad_columns, edge, fill)
+            columns = source.columns
+            taps = [(i, j, weight) for i, row in enumerate(flipped) for j, weight in enumerate(row) if weight]
+            for row in range(source.rows):
+                acc = [0] * columns
+                for i, j, weight in taps:
+                    acc = [a + weight * b for a, b in zip(acc, padded[row + i][j:j + columns])]
+                target.storage.set_row(row, acc)
+
+        return self._run_stencil(compute, steps, out)
+
+    def stencil(self, function, radius: int = 1, edge: str = 'constant', fill=None, out=None, steps: int = 1):
+        """
+        Compute every cell from its neighborhood with a Python function, as used by cellular
+        automata.
+
+        The neighborhood of a cell is the ``(2·radius + 1)²`` square centered on it, passed
+        to ``function`` as one row-major tuple (the cell itself is in the middle). The tuples
+        are zipped from shifted slices of whole padded rows, so no cell is read one by one.
 
         Args:
-            column (int): The column index.
+            function (callable): ``function(window) -> value`` of the new cell.
+            radius (int): Reach of the neighborhood in each direction.
+            edge (str): 'constant' (cells beyond the border hold ``fill``), 'nearest',
+                'reflect' or 'wrap'.
+            fill: Value of the cells beyond the border for the 'constant' edge mode,
+                the empty index by default.
+            out (Matrix): Optional matrix receiving the result; it may be this matrix, the
+                result then replaces its cells through a buffer swap.
+            steps (int): Number of times to apply the function, double-buffered.
 
         Returns:
-            list: A list of values in the specified column.
-        """
-        return self.get(column=column)
+            Matrix: The result, ``out`` if given.
 
-    def delete(self, row: int = nan, column: int = nan) -> None:
+        Raises:
+            ValueError: If the radius is negative, the edge mode is unknown or ``out`` has
+                the wrong dimensions.
         """
-        Delete the values of the elements in the specified row and/or column by setting them to the empty index.
+        if radius < 0:
+            raise ValueError("The stencil radius cannot be negative")
+        if fill is None:
+            fill = self.empty_index
+        size = 2 * radius + 1
 
-        Args:
-            row (int): The row index.
-            column (int): The column index.
-        """
-        self.insert(self.empty_index, row, column)
+        def compute(source, target):
+            padded = source._padded_rows(radius, radius, edge, fill)
+            columns = source.columns
+            for row in range(source.rows):
+                slices = [cells[j:j + columns] for cells in padded[row:row + size] for j in range(size)]
+                target.storage.set_row(row, list(map(function, zip(*slices))))
 
-    def print(self) -> None:
+        return self._run_stencil(compute, steps, out)
+
+    def _grid_cells(self):
         """
-        Print the matrix row by row.
+        Get the cells as one flat row-major sequence: the raw buffer of dense storage,
+        a snapshot list otherwise.
         """
-        for row in range(self.rows):
-            print(self.row(row))
+        storage = self.storage
+        return storage.data if storage.kind == 'dense' else list(storage.values())
 
-    def fill_rect(self, value, pos: tuple = (0, 0), area: tuple = None):
+    def _grid_offsets(self, connectivity: int) -> list:
         """
-        Fill a rectangular area of the matrix with the specified value.
+        Precompute the flat index step, column step and length of each neighbor step.
 
-        Args:
-            value: The value to fill.
-            pos (tuple): The starting position (row, column) of the rectangle.
-            area (tuple): The size (rows, columns) of the rectangle.
+        Raises:
+            ValueError: If the connectivity is not 4 or 8.
         """
-        if area is None:
-            area = (self.rows, self.columns)
-        for row in range(pos[0], pos[0] + area[0]):
-            for col in range(pos[1], pos[1] + area[1]):
-                if 0 <= row < self.rows and 0 <= col < self.columns:
-                    self.insert(value, row, col)
+        if connectivity not in GRID_NEIGHBORS:
+            raise ValueError(f"Connectivity must be 4 or 8, got {connectivity}")
+        width = self.columns
+        return [(dr * width + dc, dc, sqrt(2) if dr and dc else 1.0) for dr, dc in GRID_NEIGHBORS[connectivity]]
 
-    def fill_circ(self, center, radius, value):
+    @staticmethod
+    def _grid_mask(cells, passable) -> bytearray:
         """
-        Fill a circular area of the matrix with the specified value.
+        Evaluate a passability rule once per cell.
 
         Args:
-            center (tuple): The center (row, column) of the circle.
-            radius (int): The radius of the circle.
-            value: The value to fill.
+            cells: The flat cells.
+            passable: None (every cell), a container of passable values or a
+                ``passable(value) -> bool`` callable.
+
+        Returns:
+            bytearray: 1 for passable cells, 0 for the others.
         """
-        for row in range(center[0] - radius, center[0] + radius + 1):
-            for col in range(center[1] - radius, center[1] + radius + 1):
-                if (row - center[0]) ** 2 + (col - center[1]) ** 2 <= radius ** 2:
-                    if 0 <= row < self.rows and 0 <= col < self.columns:
-                        self.insert(value, row, col)
+        if passable is None:
+            return bytearray(b'\x01') * len(cells)
+        test = passable if callable(passable) else passable.__contains__
+        return bytearray(map(bool, map(test, cells)))
 
-    def transpose(self):
+    def _grid_labels(self, values):
         """
-        Transpose the matrix by swapping rows and columns.
+        Wrap flat integer results (labels, distances) in a dense ``'l'`` matrix.
         """
-        transposed_data = {f'r{col}c{row}': self.data[f'r{row}c{col}'] for row in range(self.rows) for col in
-                           range(self.columns)}
-        self.data = transposed_data
-        self.rows, self.columns = self.columns, self.rows
+        result = Matrix(self.rows, self.columns, typecode='l')
+        result.storage.assign(values)
+        return result
 
-    def determinant(self):
+    def _grid_bfs(self, mask, seeds, offsets) -> tuple:
         """
-        Calculate the determinant of the matrix.
+        Breadth-first search over the passable cells of a mask.
 
         Returns:
-            float: The determinant of the matrix.
+            tuple: The step distance of every cell (-1 where unreachable) and the reached
+                flat indices in visiting order.
+        """
+        width, size = self.columns, len(mask)
+        distance = [-1] * size
+        order = []
+        queue = deque()
+        for i in seeds:
+            if distance[i] < 0:
+                distance[i] = 0
+                queue.append(i)
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            col = i % width
+            step = distance[i] + 1
+            for delta, dc, _ in offsets:
+                j = i + delta
+                if 0 <= col + dc < width and 0 <= j < size and mask[j] and distance[j] < 0:
+                    distance[j] = step
+                    queue.append(j)
+        return distance, order
+
+    def flood_fill(self, start: tuple, value, connectivity: int = 4, passable=None) -> int:
+        """
+        Fill the region connected to a cell with a value.
+
+        By default the region is made of the cells holding the same value as the start
+        cell. The region is written as row spans, so the value index and change tracking
+        see one span per run of cells.
 
-        Raises:
-            ValueError: If the matrix is not square.
-        """
-        if self.rows != self.columns:
-            raise ValueError("Determinant is only defined for square matrices")
-        return self._determinant_recursive(self._to_2d_list())
+        Args:
+            start (tuple): The (row, column) of the start cell.
+            value: The value to fill.
+            connectivity (int): 4 for edge neighbors, 8 to include diagonal neighbors.
+            passable: Optional rule for the cells the fill spreads over instead: a container
+                of values or a ``passable(value) -> bool`` callable.
 
-    def _determinant_recursive(self, matrix):
-        """
-        Recursively calculate the determinant of a matrix.
+        Returns:
+            int: The number of cells filled.
+        """
+        row, col = start
+        self._check_index(row, col)
+        cells = self._grid_cells()
+        if passable is None:
+            target = cells[row * self.columns + col]
+            if target == value:
+                return 0
+            passable = (target,)
+        mask = self._grid_mask(cells, passable)
+        mask[row * self.columns + col] = 1
+        order = sorted(self._grid_bfs(mask, (row * self.columns + col,), self._grid_offsets(connectivity))[1])
+        width = self.columns
+        run_start = previous = order[0]
+        for i in order[1:] + [-1]:
+            if i != previous + 1 or i % width == 0:
+                self._write_span(run_start // width, run_start % width, previous % width + 1, value)
+                run_start = i
+            previous = i
+        return len(order)
+
+    def connected_components(self, connectivity: int = 4, passable=None) -> tuple:
+        """
+        Label the connected regions of the matrix.
+
+        By default neighboring cells holding equal values form a region and empty cells
+        are not labeled. With ``passable``, neighboring passable cells form a region
+        whatever their values.
 
         Args:
-            matrix (list): The matrix as a 2D list.
+            connectivity (int): 4 for edge neighbors, 8 to include diagonal neighbors.
+            passable: Optional rule for the labeled cells: a container of values or a
+                ``passable(value) -> bool`` callable.
 
         Returns:
-            float: The determinant of the matrix.
-        """
-        if len(matrix) == 1:
-            return matrix[0][0]
-        if len(matrix) == 2:
-            return matrix[0][0] * matrix[1][1] - matrix[0][1] * matrix[1][0]
-        det = 0
-        for c in range(len(matrix)):
-            det += ((-1) ** c) * matrix[0][c] * self._determinant_recursive(self._minor(matrix, 0, c))
-        return det
-
-    def _minor(self, matrix, row, col):
-        """
-        Calculate the minor of a matrix element.
+            tuple: A dense ``'l'`` matrix of region labels (1, 2, ... in row-major order
+                of their first cell, 0 for unlabeled cells) and the number of regions.
+        """
+        cells = self._grid_cells()
+        by_value = passable is None
+        if by_value:
+            empty = self.empty_index
+            passable = lambda cell: cell != empty  # noqa: E731
+        mask = self._grid_mask(cells, passable)
+        offsets = self._grid_offsets(connectivity)
+        width, size = self.columns, len(cells)
+        labels = [0] * size
+        count = 0
+        for seed in range(size):
+            if labels[seed] or not mask[seed]:
+                continue
+            count += 1
+            labels[seed] = count
+            value = cells[seed]
+            stack = [seed]
+            while stack:
+                i = stack.pop()
+                col = i % width
+                for delta, dc, _ in offsets:
+                    j = i + delta
+                    if (0 <= col + dc < width and 0 <= j < size and mask[j] and not labels[j]
+                            and (not by_value or cells[j] == value)):
+                        labels[j] = count
+                        stack.append(j)
+        return self._grid_labels(labels), count
+
+    def distance_field(self, sources, connectivity: int = 4, passable=None):
+        """
+        Compute the number of steps from the nearest source to every cell.
 
         Args:
-            matrix (list): The matrix as a 2D list.
-            row (int): The row index of the element.
-            col (int): The column index of the element.
+            sources (iterable): (row, column) coordinates of the source cells.
+            connectivity (int): 4 for edge neighbors, 8 to include diagonal neighbors.
+            passable: Optional rule for the cells that can be crossed: a container of values
+                or a ``passable(value) -> bool`` callable. Every cell by default.
 
         Returns:
-            list: The minor matrix as a 2D list.
+            Matrix: A dense ``'l'`` matrix of step counts, -1 for unreachable cells.
         """
-        return [row[:col] + row[col + 1:] for row in (matrix[:row] + matrix[row + 1:])]
+        width = self.columns
+        seeds = []
+        for row, col in sources:
+            self._check_index(row, col)
+            seeds.append(row * width + col)
+        mask = self._grid_mask(self._grid_cells(), passable)
+        return self._grid_labels(self._grid_bfs(mask, seeds, self._grid_offsets(connectivity))[0])
 
-    def _to_2d_list(self):
+    def find_path(self, start: tuple, goal: tuple, connectivity: int = 4, passable=None, cost=None,
+                  heuristic: bool = True):
         """
-        Convert the matrix data to a 2D list.
+        Find a cheapest path between two cells with A* (or Dijkstra without heuristic).
 
-        Returns:
-            list: The matrix as a 2D list.
-        """
-        return [[self.data[f'r{row}c{col}'] for col in range(self.columns)] for row in range(self.rows)]
+        A step costs 1, or sqrt(2) diagonally, times ``cost(value)`` of the entered cell.
+        The A* heuristic is the Manhattan (4-connectivity) or octile (8-connectivity)
+        distance, so it only finds cheapest paths when every cell cost is at least 1;
+        pass ``heuristic=False`` to run Dijkstra for smaller costs.
 
-    def inverse(self):
-        """
-        Calculate the inverse of the matrix.
+        Args:
+            start (tuple): The (row, column) of the start cell.
+            goal (tuple): The (row, column) of the goal cell.
+            connectivity (int): 4 for edge neighbors, 8 to include diagonal neighbors.
+            passable: Optional rule for the cells that can be entered: a container of values
+                or a ``passable(value) -> bool`` callable. Every cell by default.
+            cost (callable): Optional ``cost(value) -> float`` of entering a cell.
+            heuristic (bool): Whether to guide the search with the distance to the goal.
 
         Returns:
-            list: The inverse matrix as a 2D list.
+            list: The (row, column) cells from start to goal, or None if the goal cannot be reached.
+        """
+        self._check_index(*start)
+        self._check_index(*goal)
+        cells = self._grid_cells()
+        mask = self._grid_mask(cells, passable)
+        offsets = self._grid_offsets(connectivity)
+        width, size = self.columns, len(cells)
+        source, target = start[0] * width + start[1], goal[0] * width + goal[1]
+        if not mask[target]:
+            return None
+        goal_row, goal_col = goal
+
+        def estimate(i):
+            if not heuristic:
+                return 0.0
+            dr, dc = abs(i // width - goal_row), abs(i % width - goal_col)
+            if connectivity == 4:
+                return dr + dc
+            return max(dr, dc) + (sqrt(2) - 1) * min(dr, dc)
+
+        best = [inf] * size
+        came_from = {}
+        best[source] = 0.0
+        heap = [(estimate(source), 0.0, source)]
+        while heap:
+            _, spent, i = heapq.heappop(heap)
+            if i == target:
+                path = [i]
+                while i != source:
+                    i = came_from[i]
+                    path.append(i)
+                return [divmod(i, width) for i in reversed(path)]
+            if spent > best[i]:
+                continue
+            col = i % width
+            for delta, dc, length in offsets:
+                j = i + delta
+                if 0 <= col + dc < width and 0 <= j < size and mask[j]:
+                    total = spent + (length if cost is None else length * cost(cells[j]))
+                    if total < best[j]:
+                        best[j] = total
+                        came_from[j] = i
+                        heapq.heappush(heap, (total + estimate(j), total, j))
+        return None
+
+
+class MatrixView(Matrix):
+    """
+    A strided window over another matrix that shares its cells.
 
-        Raises:
-            ValueError: If the matrix is not square or is singular.
-        """
-        if self.rows != self.columns:
-            raise ValueError("Inverse is only defined for square matrices")
-        det = self.determinant()
-        if det == 0:
-            raise ValueError("Matrix is singular and cannot be inverted")
-        return self._inverse_matrix(self._to_2d_list(), det)
+    Views support the whole ``Matrix`` API; reads and writes go through to the parent,
+    and results of operations are owned matrices with the parent's storage backend.
+    Creating a view is O(1), and views of views are flattened onto the original matrix.
+    """
 
-    def _inverse_matrix(self, matrix, det):
+    def __init__(self, parent: Matrix, rows: int, columns: int, offset: tuple, strides: tuple):
         """
-        Calculate the inverse of a matrix given its determinant.
+        Initialize the view.
 
         Args:
-            matrix (list): The matrix as a 2D list.
-            det (float): The determinant of the matrix.
+            parent (Matrix): The matrix to view.
+            rows (int): Number of rows of the view.
+            columns (int): Number of columns of the view.
+            offset (tuple): Parent (row, column) of view cell (0, 0).
+            strides (tuple): Parent (row, column) steps for one view row and for one view column.
+        """
+        if isinstance(parent, MatrixView):
+            (row_r, row_c), (col_r, col_c) = strides
+            (p_row_r, p_row_c), (p_col_r, p_col_c) = parent.storage.strides
+            offset = parent.storage.locate(*offset)
+            strides = ((row_r * p_row_r + row_c * p_col_r, row_r * p_row_c + row_c * p_col_c),
+                       (col_r * p_row_r + col_c * p_col_r, col_r * p_row_c + col_c * p_col_c))
+            parent = parent.storage.parent
+        self.rows = rows
+        self.columns = columns
+        self.empty_index = parent.empty_index
+        self.storage = ViewStorage(parent, rows, columns, offset, strides)
+        self._lu = None
+        self._value_index = None
+        self._changes = None
+        self._sat = None
+        self._regions = None
+        self._mmap = None
+        self._path = None
 
-        Returns:
-            list: The inverse matrix as a 2D list.
+    @property
+    def parent(self) -> Matrix:
         """
-        n = len(matrix)
-        adjugate = [[self._cofactor(matrix, r, c) for c in range(n)] for r in range(n)]
-        adjugate = list(map(list, zip(*adjugate)))  # Transpose
-        return [[adjugate[r][c] / det for c in range(n)] for r in range(n)]
-
-    def _cofactor(self, matrix, row, col):
+        The matrix owning the cells of this view.
         """
-        Calculate the cofactor of a matrix element.
+        return self.storage.parent
 
-        Args:
-            matrix (list): The matrix as a 2D list.
-            row (int): The row index of the element.
-            col (int): The column index of the element.
+    def _like(self, rows: int, columns: int):
+        return self.parent._like(rows, columns)
 
-        Returns:
-            float: The cofactor of the element.
+    def _lu_factor(self):
+        # The parent can change under the view, so the factorization is never reused.
+        self._lu = None
+        return super()._lu_factor()
+
+    def enable_value_index(self) -> None:
         """
-        minor = self._minor(matrix, row, col)
-        return ((-1) ** (row + col)) * self._determinant_recursive(minor)
+        Views cannot keep a value index since the parent is written without them.
 
-    def add(self, other):
+        Raises:
+            TypeError: Always.
         """
-        Add another matrix to this matrix element-wise.
+        raise TypeError("Enable the value index on the parent matrix instead of a view")
 
-        Args:
-            other (Matrix): The matrix to add.
+    def enable_change_tracking(self) -> None:
+        """
+        Writes through a view are recorded by the parent, so views do not track changes.
 
         Raises:
-            ValueError: If the matrices have different dimensions.
+            TypeError: Always.
         """
-        if self.rows != other.rows or self.columns != other.columns:
-            raise ValueError("Matrices must have the same dimensions to be added")
-        for row in range(self.rows):
-            for col in range(self.columns):
-                self.data[f'r{row}c{col}'] += other.data[f'r{row}c{col}']
+        raise TypeError("Enable change tracking on the parent matrix instead of a view")
 
-    def multiply(self, other):
+    def enable_region_index(self) -> None:
         """
-        Multiply this matrix by another matrix or a scalar.
+        Views cannot keep a region index since the parent is written without them.
 
-        Args:
-            other (Matrix or scalar): The matrix or scalar to multiply by.
+        Raises:
+            TypeError: Always.
+        """
+        raise TypeError("Enable the region index on the parent matrix instead of a view")
 
-        Returns:
-            Matrix: The result of the multiplication.
+    def _summed_area(self) -> tuple:
+        # The parent can change under the view, so the table is never reused.
+        self._sat = None
+        return super()._summed_area()
 
-        Raises:
-            ValueError: If the matrices cannot be multiplied.
+    def _changed(self, region: tuple = None) -> None:
         """
-        if isinstance(other, Matrix):
-            if self.columns != other.rows:
-                raise ValueError("Matrices cannot be multiplied")
-            result = Matrix(self.rows, other.columns)
-            for i in range(self.rows):
-                for j in range(other.columns):
-                    result.data[f'r{i}c{j}'] = sum(
-                        self.data[f'r{i}c{k}'] * other.data[f'r{k}c{j}'] for k in range(self.columns))
-            return result
-        else:  # Assume other is a scalar
-            for key in self.data:
-                self.data[key] *= other
+        Report a bulk rewrite of the view to the parent as the rectangle it spans there,
+        since it may have bypassed the parent's write funnel.
+        """
+        self._lu = None
+        if not (self.rows and self.columns):
+            return
+        locate = self.storage.locate
+        corners = [locate(row, col) for row in (0, self.rows - 1) for col in (0, self.columns - 1)]
+        rows, columns = [row for row, _ in corners], [col for _, col in corners]
+        self.parent._changed((min(rows), min(columns), max(rows), max(columns)))
 
-    def trace(self):
+    def copy(self):
         """
-        Calculate the trace of the matrix (sum of the diagonal elements).
+        Create an owned copy of the viewed cells.
 
         Returns:
-            float: The trace of the matrix.
-
-        Raises:
-            ValueError: If the matrix is not square.
+            Matrix: The copy, with the parent's storage backend.
         """
-        if self.rows != self.columns:
-            raise ValueError("Trace is only defined for square matrices")
-        return sum(self.data[f'r{i}c{i}'] for i in range(self.rows))
+        result = self._like(self.rows, self.columns)
+        result.storage.assign(self.storage.values())
+        return result
 
-    def submatrix(self, start_row, start_col, end_row, end_col):
+    def to_numpy(self):
         """
-        Extract a submatrix from the matrix.
+        Get the viewed cells as a 2D NumPy array.
 
-        Args:
-            start_row (int): The starting row index.
-            start_col (int): The starting column index.
-            end_row (int): The ending row index.
-            end_col (int): The ending column index.
+        Views over a dense parent with a typecode return a strided array sharing its memory.
 
         Returns:
-            Matrix: The extracted submatrix.
+            numpy.ndarray: The ``rows x columns`` array.
         """
-        sub = Matrix(end_row - start_row + 1, end_col - start_col + 1)
-        for row in range(start_row, end_row + 1):
-            for col in range(start_col, end_col + 1):
-                sub.data[f'r{row - start_row}c{col - start_col}'] = self.data[f'r{row}c{col}']
-        return sub
+        parent = self.parent
+        if parent.storage.kind != 'dense' or parent.storage.typecode is None:
+            return super().to_numpy()
+        offset, row_stride, col_stride = self.storage._flat_strides()
+        flat = parent.to_numpy().reshape(-1)
+        return numpy.lib.stride_tricks.as_strided(
+            flat[offset:], (self.rows, self.columns), (row_stride * flat.itemsize, col_stride * flat.itemsize))
 
-    def swap_rows(self, row1, row2):
+
+class LazyMatrix(Matrix):
+    """
+    A matrix defined by a deferred expression over other matrices.
+
+    ``add``, ``subtract``, scalar and matrix ``multiply``, ``hadamard_product`` and the
+    arithmetic operators never mutate and return new lazy nodes. The tree is evaluated
+    once, on ``evaluate()`` or on the first access to the cells, as a single pass over the
+    output rows: each output row is built from rows of the operands, with a matrix product
+    followed by an addition, subtraction or scaling computed in one kernel. Only the right
+    operand of a matrix product is materialized (as columns); no other intermediate matrix
+    is allocated.
+
+    Operands are read at evaluation time, so changes made to them before then are seen.
+    Once evaluated, a lazy matrix behaves like a regular matrix, except that further
+    arithmetic on it is lazy as well.
+    """
+
+    def __init__(self, op: str, operands: tuple, rows: int, columns: int, template: Matrix):
         """
-        Swap two rows in the matrix.
+        Initialize an expression node.
 
         Args:
-            row1 (int): The first row index.
-            row2 (int): The second row index.
+            op (str): 'leaf', 'add', 'sub', 'scale', 'matmul' or 'hadamard'.
+            operands (tuple): The operand matrices, plus the scalar for 'scale'.
+            rows (int): Number of rows of the result.
+            columns (int): Number of columns of the result.
+            template (Matrix): Matrix whose storage backend and empty index the result uses.
         """
-        for col in range(self.columns):
-            self.data[f'r{row1}c{col}'], self.data[f'r{row2}c{col}'] = self.data[f'r{row2}c{col}'], self.data[
-                f'r{row1}c{col}']
+        self.rows = rows
+        self.columns = columns
+        self.empty_index = template.empty_index
+        self._template = template
+        self._op = op
+        self._operands = operands
+        self._backend = 'auto'
+        self._storage = None
+        self._lu = None
+        self._value_index = None
+        self._changes = None
+        self._sat = None
+        self._regions = None
+        self._mmap = None
+        self._path = None
 
-    def swap_columns(self, col1, col2):
+    @property
+    def storage(self):
+        if self._storage is None:
+            self.evaluate()
+        return self._storage
+
+    @storage.setter
+    def storage(self, value):
+        self._storage = value
+
+    @property
+    def pending(self) -> bool:
         """
-        Swap two columns in the matrix.
+        Whether the expression has not been evaluated yet.
+        """
+        return self._storage is None
+
+    def _like(self, rows: int, columns: int):
+        return self._template._like(rows, columns)
+
+    def add(self, other, out=None):
+        """
+        Lazily add another matrix element-wise.
 
         Args:
-            col1 (int): The first column index.
-            col2 (int): The second column index.
+            other (Matrix): The matrix to add.
+            out (Matrix): If given, the expression is evaluated at once into this matrix.
+
+        Returns:
+            Matrix: The sum expression, or ``out``.
+
+        Raises:
+            ValueError: If the matrices have different dimensions.
         """
-        for row in range(self.rows):
-            self.data[f'r{row}c{col1}'], self.data[f'r{row}c{col2}'] = self.data[f'r{row}c{col2}'], self.data[
-                f'r{row}c{col1}']
+        if self.rows != other.rows or self.columns != other.columns:
+            raise ValueError("Matrices must have the same dimensions to be added")
+        return _lazy_result(LazyMatrix('add', (self, other), self.rows, self.columns, self._template), out)
 
-    def fill_diagonal(self, value):
+    def subtract(self, other, out=None):
         """
-        Fill the diagonal of the matrix with the specified value.
+        Lazily subtract another matrix element-wise.
 
         Args:
-            value: The value to fill.
+            other (Matrix): The matrix to subtract.
+            out (Matrix): If given, the expression is evaluated at once into this matrix.
+
+        Returns:
+            Matrix: The difference expression, or ``out``.
+
+        Raises:
+            ValueError: If the matrices have different dimensions.
         """
-        for i in range(min(self.rows, self.columns)):
-            self.data[f'r{i}c{i}'] = value
+        if self.rows != other.rows or self.columns != other.columns:
+            raise ValueError("Matrices must have the same dimensions to be subtracted")
+        return _lazy_result(LazyMatrix('sub', (self, other), self.rows, self.columns, self._template), out)
 
-    def power(self, n):
+    def multiply(self, other, backend: str = 'auto', out=None):
         """
-        Raise the matrix to the given power.
+        Lazily multiply by another matrix or a scalar.
 
         Args:
-            n (int): The power to raise the matrix to.
+            other (Matrix or scalar): The matrix or scalar to multiply by.
+            backend (str): Backend for matrix products large enough to leave the fused
+                kernel, see ``Matrix.multiply``.
+            out (Matrix): If given, the expression is evaluated at once into this matrix.
 
         Returns:
-            Matrix: The result of raising the matrix to the power.
+            Matrix: The product expression, or ``out``.
 
         Raises:
-            ValueError: If the matrix is not square.
+            ValueError: If the matrices cannot be multiplied.
         """
-        if self.rows != self.columns:
-            raise ValueError("Power is only defined for square matrices")
-        result = Matrix(self.rows, self.columns)
-        for i in range(self.rows):
-            result.data[f'r{i}c{i}'] = 1  # Identity matrix
-        for _ in range(n):
-            result = result.multiply(self)
-        return result
+        if not isinstance(other, Matrix):
+            return _lazy_result(LazyMatrix('scale', (self, other), self.rows, self.columns, self._template), out)
+        if self.columns != other.rows:
+            raise ValueError("Matrices cannot be multiplied")
+        node = LazyMatrix('matmul', (self, other), self.rows, other.columns, self._template)
+        node._backend = backend
+        return _lazy_result(node, out)
 
-    def hadamard_product(self, other):
+    def hadamard_product(self, other, out=None):
         """
-        Compute the element-wise product of this matrix and another matrix.
+        Lazily multiply by another matrix element-wise.
 
         Args:
             other (Matrix): The matrix to multiply element-wise.
+            out (Matrix): If given, the expression is evaluated at once into this matrix.
 
         Returns:
-            Matrix: The result of the element-wise multiplication.
+            Matrix: The product expression, or ``out``.
 
         Raises:
             ValueError: If the matrices have different dimensions.
         """
         if self.rows != other.rows or self.columns != other.columns:
             raise ValueError("Matrices must have the same dimensions for Hadamard product")
-        result = Matrix(self.rows, self.columns)
-        for row in range(self.rows):
-            for col in range(self.columns):
-                result.data[f'r{row}c{col}'] = self.data[f'r{row}c{col}'] * other.data[f'r{row}c{col}']
-        return result
+        return _lazy_result(LazyMatrix('hadamard', (self, other), self.rows, self.columns, self._template), out)
 
-    def norm(self):
+    def __add__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.add(other)
+
+    def __sub__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.subtract(other)
+
+    def __mul__(self, other):
+        if isinstance(other, Matrix):
+            return self.hadamard_product(other)
+        return self.multiply(other)
+
+    def __rmul__(self, other):
+        return self.multiply(other)
+
+    def __matmul__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self.multiply(other)
+
+    def __neg__(self):
+        return self.multiply(-1)
+
+    # In-place operators build a new node and rebind the name; nothing is mutated.
+    __iadd__, __isub__, __imul__, __imatmul__ = __add__, __sub__, __mul__, __matmul__
+
+    def evaluate(self, out=None):
         """
-        Calculate the Frobenius norm of the matrix.
+        Run the expression as one fused pass and keep the result.
+
+        Args:
+            out (Matrix): Optional matrix of the same dimensions to write the rows into
+                instead. It may be one of the operands: every output row only depends on
+                the same row of element-wise operands, and the right side of a matrix
+                product is materialized before the first row is written.
 
         Returns:
-            float: The Frobenius norm of the matrix.
+            Matrix: This matrix, now holding its cells, or ``out``.
+        """
+        if out is not None:
+            self._check_out(out, self.rows, self.columns)
+            if self._storage is not None:
+                out.storage.assign(list(self._storage.values()))
+            else:
+                row_of = self._compile()
+                for row in range(self.rows):
+                    out.storage.set_row(row, row_of(row))
+            out._changed()
+            return out
+        if self._storage is not None:
+            return self
+        row_of = self._compile()
+        storage = self._template._like(self.rows, self.columns).storage
+        for row in range(self.rows):
+            storage.set_row(row, row_of(row))
+        self._storage = storage
+        self._operands = ()
+        return self
+
+    def _compile(self):
         """
-        return sum(value ** 2 for value in self.data.values()) ** 0.5
+        Compile the expression into a function computing one output row.
+
+        Returns:
+            callable: ``row_of(row) -> list`` of the output cells of that row.
+        """
+        op, operands = self._op, self._operands
+        if op == 'leaf':
+            return _row_source(operands[0])
+        if op == 'matmul':
+            return self._compile_matmul()
+        if op == 'scale':
+            source, factor = operands
+            if _pending_op(source) == 'matmul':
+                return source._compile_matmul(lambda product, _: product * factor)
+            row_of = _row_source(source)
+            return lambda row: [value * factor for value in row_of(row)]
+        left, right = operands
+        if op == 'add' and _pending_op(left) == 'matmul':
+            right_of = _row_source(right)
+            return left._compile_matmul(lambda product, other: product + other, right_of)
+        if op == 'add' and _pending_op(right) == 'matmul':
+            left_of = _row_source(left)
+            return right._compile_matmul(lambda product, other: other + product, left_of)
+        if op == 'sub' and _pending_op(left) == 'matmul':
+            right_of = _row_source(right)
+            return left._compile_matmul(lambda product, other: product - other, right_of)
+        if op == 'sub' and _pending_op(right) == 'matmul':
+            left_of = _row_source(left)
+            return right._compile_matmul(lambda product, other: other - product, left_of)
+        left_of, right_of = _row_source(left), _row_source(right)
+        if op == 'add':
+            return lambda row: [a + b for a, b in zip(left_of(row), right_of(row))]
+        if op == 'sub':
+            return lambda row: [a - b for a, b in zip(left_of(row), right_of(row))]
+        return lambda row: [a * b for a, b in zip(left_of(row), right_of(row))]
+
+    def _compile_matmul(self, combine=None, other_of=None):
+        """
+        Compile a matrix product node, optionally fused with an element-wise epilogue.
+
+        Products big enough for the NumPy or parallel backends are computed with
+        ``Matrix.multiply`` instead and only the epilogue is fused.
+
+        Args:
+            combine (callable): Optional ``combine(product_cell, other_cell)`` applied to each output cell.
+            other_of (callable): Row source of the second epilogue operand.
+
+        Returns:
+            callable: ``row_of(row) -> list`` of the output cells of that row.
+        """
+        left, right = self._operands
+        backend = self._backend
+        if _choose_backend(backend, self.rows * left.columns * self.columns) != 'python':
+            product_of = Matrix.multiply(_materialize(left), _materialize(right), backend).storage.row
+            if combine is None:
+                return product_of
+            if other_of is None:
+                return lambda row: [combine(value, None) for value in product_of(row)]
+            return lambda row: [combine(a, b) for a, b in zip(product_of(row), other_of(row))]
+        left_of = _row_source(left)
+        if _pending_op(right) is None:
+            columns = [right.storage.column(col) for col in range(right.columns)]
+        else:
+            right_of = right._compile()
+            columns = [list(column) for column in zip(*(right_of(row) for row in range(right.rows)))]
+        if combine is None:
+            def row_of(row):
+                values = left_of(row)
+                return [sum(map(mul, values, column)) for column in columns]
+        elif other_of is None:
+            def row_of(row):
+                values = left_of(row)
+                return [combine(sum(map(mul, values, column)), None) for column in columns]
+        else:
+            def row_of(row):
+                values = left_of(row)
+                return [combine(sum(map(mul, values, column)), other)
+                        for column, other in zip(columns, other_of(row))]
+        return row_of
+
+
+def _lazy_result(node, out):
+    """
+    Return a new expression node, or evaluate it at once into ``out`` if one is given.
+    """
+    return node if out is None else node.evaluate(out)
+
+
+def _pending_op(matrix):
+    """
+    Get the operation of an unevaluated lazy matrix, or None for anything already holding cells.
+    """
+    if isinstance(matrix, LazyMatrix) and matrix.pending:
+        return matrix._op
+    return None
+
+
+def _row_source(matrix):
+    """
+    Get a ``row_of(row) -> list`` function reading rows of a matrix or of an unevaluated expression.
+    """
+    if _pending_op(matrix) is None:
+        return matrix.storage.row
+    return matrix._compile()
+
+
+def _materialize(matrix):
+    """
+    Get a matrix holding the cells of an operand: the wrapped matrix of a pending leaf,
+    the evaluated result of any other pending expression, or the operand itself.
+    """
+    op = _pending_op(matrix)
+    if op == 'leaf':
+        return matrix._operands[0]
+    return matrix.evaluate() if op is not None else matrix
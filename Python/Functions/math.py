@@ -2,8 +2,18 @@ from typing import Tuple
 from math import (log10, log2, degrees, radians, dist, gamma, isqrt, prod, 
                  remainder, trunc, expm1, log1p, sqrt, ceil, floor, isfinite, 
                  isinf, isnan, nan, inf, pi, tau, e)
+from math import (acos as _acos, asin as _asin, atan as _atan, atan2 as _atan2,
+                  cos as _cos, cosh as _cosh, exp as _exp, expm1 as _expm1,
+                  log as _log, log10 as _log10, log1p as _log1p, log2 as _log2,
+                  sin as _sin, sinh as _sinh, sqrt as _sqrt, tan as _tan, tanh as _tanh)
+from array import array
 import struct
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # Constants
 pi: float = 3.141592653589793
 piFast: float = 3.14159265359
@@ -27,29 +37,148 @@ def sqrt(a): return a ** 0.5
 def sub(a, b): return a - b
 
 # Trigonometric functions
-def cos(a):
-    # Using Taylor series approximation for cos(x)
-    x = wrap_angle(a)  # Normalize angle to [-π, π]
-    
-    # Taylor series terms: 1 - x²/2! + x⁴/4! - x⁶/6! + x⁸/8!
+# Accuracy tiers, from most to least accurate:
+#   - stdlib math and the *_batch functions: within 1 ulp.
+#   - sin, cos, tan: Cody-Waite reduction to [-π/4, π/4] plus degree 15/16 Taylor
+#     polynomials, within a few ulp (about 2e-16 absolute) for |a| < 1.6e6. Larger
+#     angles are reduced with fmod against the float 2π, losing about |a|·1e-16.
+#   - sin_table, cos_table, tan_table: linear interpolation in a table of `size`
+#     samples per turn, absolute error up to (2π/size)²/8: 7.5e-5 for 256 samples,
+#     4.7e-6 for 1024, 2.9e-7 for 4096, 1.1e-9 for 65536. tan_table divides the two.
+
+# Cody-Waite split of π/2: the leading parts have 33 significant bits, so their products
+# with any integer below 2**20 are exact and the reduction keeps full precision.
+_HALF_PI_1 = 1.5707963267341256
+_HALF_PI_2 = 6.077100506303966e-11
+_HALF_PI_3 = 2.0222662487959506e-21
+_TWO_OVER_PI = 0.6366197723675814
+_REDUCTION_LIMIT = 1 << 20
+TRIG_TABLE_SIZES = (256, 1024, 4096, 65536)
+_TRIG_TABLES = {}
+
+def _quadrant(a):
+    # Reduce a to r in [-π/4, π/4] and the quadrant k so that a = r + k·π/2
+    try:
+        k = round(a * _TWO_OVER_PI)
+    except (ValueError, OverflowError):
+        return nan, 0
+    if not -_REDUCTION_LIMIT < k < _REDUCTION_LIMIT:
+        a = remainder(a, tau)
+        k = round(a * _TWO_OVER_PI)
+    return ((a - k * _HALF_PI_1) - k * _HALF_PI_2) - k * _HALF_PI_3, k & 3
+
+def _sin_poly(x):
+    # Taylor series terms up to x¹⁵/15!, accurate to double precision on [-π/4, π/4]
     x2 = x * x
-    return (1 - x2/2 + x2*x2/24 - x2*x2*x2/720 + x2*x2*x2*x2/40320)
+    return x + x * x2 * (-1/6 + x2 * (1/120 + x2 * (-1/5040 + x2 * (1/362880 + x2 * (
+        -1/39916800 + x2 * (1/6227020800 + x2 * (-1/1307674368000)))))))
 
-def sin(a):
-    # Using Taylor series approximation for sin(x)
-    x = wrap_angle(a)  # Normalize angle to [-π, π]
-    
-    # Taylor series terms: x - x³/3! + x⁵/5! - x⁷/7! + x⁹/9!
+def _cos_poly(x):
+    # Taylor series terms up to x¹⁶/16!, accurate to double precision on [-π/4, π/4]
     x2 = x * x
-    return (x - x2*x/6 + x2*x2*x/120 - x2*x2*x2*x/5040 + x2*x2*x2*x2*x/362880)
+    return 1 + x2 * (-1/2 + x2 * (1/24 + x2 * (-1/720 + x2 * (1/40320 + x2 * (-1/3628800 + x2 * (
+        1/479001600 + x2 * (-1/87178291200 + x2 * (1/20922789888000))))))))
+
+def cos(a):
+    x, k = _quadrant(a)
+    if k == 0:
+        return _cos_poly(x)
+    if k == 1:
+        return -_sin_poly(x)
+    if k == 2:
+        return -_cos_poly(x)
+    return _sin_poly(x)
+
+def sin(a):
+    x, k = _quadrant(a)
+    if k == 0:
+        return _sin_poly(x)
+    if k == 1:
+        return _cos_poly(x)
+    if k == 2:
+        return -_sin_poly(x)
+    return -_cos_poly(x)
 
 def tan(a):
-    # Using Taylor series approximation for tan(x)
-    x = wrap_angle(a)  # Normalize angle to [-π, π]
-    
-    # Taylor series terms: x + x³/3 + 2x⁵/15 + 17x⁷/315 + 62x⁹/2835
-    x2 = x * x
-    return (x + x*x2/3 + 2*x2*x2*x/15 + 17*x2*x2*x2*x/315 + 62*x2*x2*x2*x2*x/2835)
+    # Ratio of the reduced sine and cosine, so it follows tan through its poles
+    x, k = _quadrant(a)
+    s, c = _sin_poly(x), _cos_poly(x)
+    if k & 1:
+        return -c / s if s else inf
+    return s / c
+
+def _trig_table(size: int) -> array:
+    table = _TRIG_TABLES.get(size)
+    if table is None:
+        if size < 4 or size & (size - 1):
+            raise ValueError(f"Trig table size must be a power of two of at least 4, got {size}")
+        # One extra sample so interpolation never wraps
+        table = _TRIG_TABLES[size] = array('d', [_sin(tau * i / size) for i in range(size + 1)])
+    return table
+
+def _table_lookup(a, size: int, offset: float) -> float:
+    table = _TRIG_TABLES.get(size) or _trig_table(size)
+    if not -tau <= a <= tau:
+        if not isfinite(a):
+            return nan
+        a = wrap_angle(a)
+    x = a * (size / tau) + offset
+    i = int(x // 1)
+    j = i & (size - 1)
+    low = table[j]
+    return low + (table[j + 1] - low) * (x - i)
+
+def cos_table(a, size: int = 1024) -> float:
+    """Approximates cos(a) by linear interpolation in a sine table.
+
+    Args:
+        a (float): Angle in radians
+        size (int): Table samples per turn, a power of two (see TRIG_TABLE_SIZES)
+
+    Returns:
+        float: cos(a), within (2π/size)²/8, nan for infinities and nan
+
+    Raises:
+        ValueError: If size is not a power of two of at least 4
+
+    Notes:
+        - Tables are built once per size, on first use, with size + 1 doubles
+    """
+    return _table_lookup(a, size, size / 4)
+
+def sin_table(a, size: int = 1024) -> float:
+    """Approximates sin(a) by linear interpolation in a sine table.
+
+    Args:
+        a (float): Angle in radians
+        size (int): Table samples per turn, a power of two (see TRIG_TABLE_SIZES)
+
+    Returns:
+        float: sin(a), within (2π/size)²/8, nan for infinities and nan
+
+    Raises:
+        ValueError: If size is not a power of two of at least 4
+    """
+    return _table_lookup(a, size, 0.0)
+
+def tan_table(a, size: int = 1024) -> float:
+    """Approximates tan(a) as sin_table(a) / cos_table(a).
+
+    Args:
+        a (float): Angle in radians
+        size (int): Table samples per turn, a power of two (see TRIG_TABLE_SIZES)
+
+    Returns:
+        float: tan(a), inf where the interpolated cosine is 0, nan for infinities and nan
+
+    Raises:
+        ValueError: If size is not a power of two of at least 4
+
+    Notes:
+        - Both lookups are within (2π/size)²/8, so the error grows near the poles
+    """
+    c =_table_lookup(a, size, size / 4)
+    return _table_lookup(a, size, 0.0) / c if c else inf
 
 # Inverse trigonometric functions
 def acos(a):
@@ -182,6 +311,103 @@ def log10(a): return log(a) / log(10)
 def log1p(a): return log(1 + a)
 def log2(a): return log(a) / log(2)
 
+# Batch functions
+# Array in, array out: each takes a sequence of numbers (array('d'), memoryview, NumPy
+# array, list...) and returns the results, written into `out` when given. They run as
+# NumPy ufuncs when NumPy is available, otherwise as one C-level map of the stdlib
+# function. Both are within 1 ulp (they may differ in the last bit) and agree on
+# every edge case: nan outside the domain, ±inf at poles and on overflow.
+def _as_numpy(values):
+    if isinstance(values, numpy.ndarray):
+        return values
+    try:
+        view = memoryview(values)
+    except TypeError:
+        return numpy.asarray(values, dtype='d')
+    return numpy.frombuffer(view, dtype=view.format) if view.ndim == 1 else numpy.asarray(view, dtype='d')
+
+def _guarded(function, pole=None, odd=False):
+    # Map stdlib domain and range errors to the values the NumPy ufuncs give: -inf at the
+    # pole (log(0)), nan elsewhere outside the domain, and an infinity with the sign of
+    # the input on overflow for odd functions (sinh), +inf for the others
+    def guarded(*args):
+        try:
+            return function(*args)
+        except ValueError:
+            return -inf if args[0] == pole else nan
+        except OverflowError:
+            return -inf if odd and args[0] < 0 else inf
+    return guarded
+
+def _batch(name: str, function, *operands, out=None, pole=None, odd=False):
+    """Applies a function element-wise over whole sequences.
+
+    Args:
+        name (str): Name of the NumPy ufunc
+        function (callable): Equivalent stdlib scalar function
+        *operands: Input sequences of equal length
+        out: Optional writable buffer (array, memoryview, NumPy array) of the same length
+        pole: Input at which the function tends to -inf (0 for log)
+        odd (bool): Whether overflow takes the sign of the input
+
+    Returns:
+        `out` when given, a NumPy array for NumPy input, otherwise an array('d')
+
+    Raises:
+        ValueError: If the operands or `out` differ in length
+
+    Notes:
+        - Inputs outside the domain give nan or ±inf instead of raising, the same
+          values on the NumPy and the stdlib path
+        - `out` may be one of the operands for in-place evaluation
+    """
+    count = len(operands[0])
+    if any(len(operand) != count for operand in operands) or (out is not None and len(out) != count):
+        raise ValueError(f"All sequences must hold {count} values")
+    if numpy is not None:
+        arrays = [_as_numpy(operand) for operand in operands]
+        if out is None:
+            if isinstance(operands[0], numpy.ndarray):
+                target = result = None
+            else:
+                result = array('d', bytes(8 * count))
+                target = numpy.frombuffer(result, dtype='d')
+        else:
+            result = out
+            target = out if isinstance(out, numpy.ndarray) else numpy.frombuffer(out, dtype=memoryview(out).format)
+        with numpy.errstate(all='ignore'):
+            values = getattr(numpy, name)(*arrays, out=target)
+        return values if result is None else result
+    try:
+        values = array('d', map(function, *operands))
+    except (ValueError, OverflowError):
+        values = array('d', map(_guarded(function, pole, odd), *operands))
+    if out is None:
+        return values
+    if isinstance(out, array):
+        out[:] = values if out.typecode == 'd' else array(out.typecode, values)
+    else:
+        out[:] = array(memoryview(out).format, values)
+    return out
+
+def acos_batch(a, out=None): return _batch('arccos', _acos, a, out=out)
+def asin_batch(a, out=None): return _batch('arcsin', _asin, a, out=out)
+def atan_batch(a, out=None): return _batch('arctan', _atan, a, out=out)
+def atan2_batch(y, x, out=None): return _batch('arctan2', _atan2, y, x, out=out)
+def cos_batch(a, out=None): return _batch('cos', _cos, a, out=out)
+def cosh_batch(a, out=None): return _batch('cosh', _cosh, a, out=out)
+def exp_batch(a, out=None): return _batch('exp', _exp, a, out=out)
+def expm1_batch(a, out=None): return _batch('expm1', _expm1, a, out=out)
+def log_batch(a, out=None): return _batch('log', _log, a, out=out, pole=0.0)
+def log10_batch(a, out=None): return _batch('log10', _log10, a, out=out, pole=0.0)
+def log1p_batch(a, out=None): return _batch('log1p', _log1p, a, out=out, pole=-1.0)
+def log2_batch(a, out=None): return _batch('log2', _log2, a, out=out, pole=0.0)
+def sin_batch(a, out=None): return _batch('sin', _sin, a, out=out)
+def sinh_batch(a, out=None): return _batch('sinh', _sinh, a, out=out, odd=True)
+def sqrt_batch(a, out=None): return _batch('sqrt', _sqrt, a, out=out)
+def tan_batch(a, out=None): return _batch('tan', _tan, a, out=out)
+def tanh_batch(a, out=None): return _batch('tanh', _tanh, a, out=out)
+
 # Number theory functions
 def fact(a):
     if a == 0:
@@ -378,13 +604,13 @@ def wrap_angle(angle: float) -> float:
     """Wraps an angle to the range [-π, π].
     
     Normalizes any angle to equivalent angle in [-π, π] range
-    by adding or subtracting 2π as needed.
+    by subtracting the nearest multiple of 2π in constant time.
     
     Args:
         angle (float): Angle in radians to wrap
         
     Returns:
-        float: Equivalent angle in [-π, π] range
+        float: Equivalent angle in [-π, π] range, nan for infinities and nan
         
     Examples:
         >>> wrap_angle(4 * math.pi)  # 720 degrees
@@ -398,9 +624,14 @@ def wrap_angle(angle: float) -> float:
         - Useful for normalizing rotation angles
         - Preserves angle equivalence (sinθ, cosθ)
         - Input can be any real number
+        - Uses math.remainder, which is exact; odd multiples of π wrap to π with
+          the sign of the input
     """
-    while angle > pi:
-        angle -= 2 * pi
-    while angle < -pi:
-        angle += 2 * pi
-    return angle
\ No newline at end of file
+    if -pi <= angle <= pi:
+        return angle
+    if not isfinite(angle):
+        return nan
+    wrapped = remainder(angle, tau)
+    if wrapped == pi or wrapped == -pi:
+        return pi if angle > 0 else -pi
+    return wrapped